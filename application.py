@@ -20,26 +20,26 @@
 """
 
 import os
-import json
+import asyncio
 from secrets import token_hex
 
-from utils import parseBoolean, parseInt
 from log_config import getNewLogger
 
-# For .env file
-from dotenv import load_dotenv
-load_dotenv()
+# Settings from .env file
+from settings import settings
 
 # Database
 from database import DatabaseConnector
+from reference_cache import ReferenceCache
 
 # Valkey
-import valkey
+from valkey.asyncio import Valkey, ConnectionPool
 
 # ASGI Application
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from middleware import AuthASGIMiddleware, DatabaseConnectionMiddleware
 
 # Task Handler
 from tasks import TaskHandler
@@ -51,33 +51,47 @@ from graphql_api import GraphQLApi
 async def lifespan(app: FastAPI):
 	# App startup code
 	app.state.logger.info('on_startup()')
+	app.state.logger.info(f'Event loop: {type(asyncio.get_running_loop()).__module__}')
+
+	# Init Valkey cache
+	app.state.valkey = None
+	app.state.pubsub = None
+	if settings.valkey_host != None and settings.valkey_host != '':
+		app.state.valkeyPool = ConnectionPool(
+			host = settings.valkey_host,
+			port = settings.valkey_port,
+			db = settings.valkey_db,
+			max_connections = settings.valkey_max_connections
+		)
+		app.state.valkey = Valkey(connection_pool=app.state.valkeyPool)
+		# Fail fast on misconfiguration
+		await app.state.valkey.ping()
+		app.state.pubsub = app.state.valkey.pubsub()
 
 	# Create database instance
-	dbCon = DatabaseConnector()
+	dbCon = DatabaseConnector(app.state.valkey)
 	app.state.dbCon = dbCon
 	await dbCon.openPool()
 
+	# Snapshot of the small reference tables
+	app.state.referenceCache = ReferenceCache(dbCon)
+	await app.state.referenceCache.start()
+
 	# Task handler initialization
 	th = TaskHandler(dbCon)
 	await th.loadJobs()
 	app.state.taskHandler = th
 
-	# Init Valkey cache
-	app.state.pubsub = None
-	if os.environ.get('valkey_host') != None and os.environ.get('valkey_host') != '':
-		app.state.valkey = valkey.Valkey(
-			host = os.environ.get('valkey_host'),
-			port = int(os.environ.get('valkey_port')),
-			db = int(os.environ.get('valkey_db'))
-		)
-		app.state.pubsub = app.state.valkey.pubsub()
-	
 	yield
 	
 	# Cleanup
 	app.state.logger.info('on_shutdown()')
 	await app.state.taskHandler.shutdown()
+	await app.state.referenceCache.stop()
 	await app.state.dbCon.closePool()
+	if app.state.valkey != None:
+		await app.state.valkey.aclose()
+		await app.state.valkeyPool.disconnect()
 
 
 def createApp() -> FastAPI:
@@ -90,23 +104,24 @@ def createApp() -> FastAPI:
 			'name': 'Affero General Public License 3.0',
 			'url': 'https://www.gnu.org/licenses/agpl-3.0.de.html',
 		},
-		debug = parseBoolean(os.environ.get('debug'))
+		debug = settings.debug
 	)
 
 	# Create app logger
 	logger = getNewLogger('gql')
 	app.state.logger = logger
 
+	# Credentials are not allowed together with a wildcard origin
 	app.add_middleware(
 		CORSMiddleware,
-		allow_origins=["*"],
-		allow_credentials=True,
-		allow_methods=["*"],
-		allow_headers=["*"],
+		allow_origins=list(settings.cors_origins),
+		allow_credentials='*' not in settings.cors_origins,
+		allow_methods=['GET', 'POST', 'OPTIONS'],
+		allow_headers=['content-type', 'x-auth-token'],
 	)
 
 	# Generate auth token for updaters if not exist
-	TOKEN_PATH = os.environ.get('token_path')
+	TOKEN_PATH = settings.token_path
 	if os.path.exists(TOKEN_PATH) == False:
 		app.state.authToken = token_hex(16)
 		with open(TOKEN_PATH, 'w') as f:
@@ -114,45 +129,16 @@ def createApp() -> FastAPI:
 		logger.warning(f'Generated a new auth token: {app.state.authToken[:4]}...{app.state.authToken[-4:]}')
 	else:
 		with open(TOKEN_PATH, 'r') as f:
-			app.state.authToken = f.readline()
+			app.state.authToken = f.read().strip()
 		logger.info(f'Found auth token: {app.state.authToken[:4]}...{app.state.authToken[-4:]}')
+	app.state.authTokenBytes = app.state.authToken.encode('ascii')
+
+	# One shared database connection per request
+	app.add_middleware(DatabaseConnectionMiddleware, connector_getter=lambda: app.state.dbCon)
 
-	@app.middleware("http")
-	async def authMiddleware(request: Request, call_next):
-		# Add code before processing request
-		#print(request)
-		#print(request.state)
-		#print(request.method)
-		#print(request.url.query)
-		#print(request.query_params)
-		#print(request.path_params)
-		#print(request.headers)
-
-		response = Response(json.dumps({'status': 500, 'message':'server error'}), 500, media_type='application/json')
-
-		try:
-			# Block all mutation calls to GraphQL
-			if request.method == 'POST':
-				data = await request.body()
-				jobj = json.loads(data.decode('utf-8'))
-				# jobj['operationName'] -> user defined operation name, NOT GraphQL query/mutation
-				if jobj['query'].startswith('mutation'):
-					# We need some authorization to do modifications
-					if 'x-auth-token' in request.headers.keys() and request.headers['x-auth-token'] == app.state.authToken:
-						pass
-					else:
-						app.state.logger.warning(f'Unauthorized mutation {jobj}')
-						return Response(json.dumps({'status': 401, 'message':'not authenticated'}), 401, media_type='application/json')
-			
-			response = await call_next(request)
-		except:
-			pass
-
-		# Add code after processing the request
-		#response.headers["X-Foo-Header"] = 'Bar'
-
-		return response
+	# Block all unauthorized mutation calls to GraphQL (outermost middleware)
+	app.add_middleware(AuthASGIMiddleware, token_getter=lambda: app.state.authTokenBytes)
 
 	app.state.graphQlApi = GraphQLApi()
-	app.mount(os.environ.get('gql_path'), app.state.graphQlApi.gqlApp)
+	app.mount(settings.gql_path, app.state.graphQlApi.gqlApp)
 	return app
\ No newline at end of file
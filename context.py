@@ -26,8 +26,11 @@ from log_config import logger
 from asyncpg import Pool
 from tasks import TaskHandler
 
-from database import DatabaseConnector
+from database import DatabaseConnector, RequestConnection
+from loaders import Loaders
+from reference_cache import ReferenceCache
 from graphql.type import GraphQLResolveInfo
+from graphql.language import SelectionSetNode, FieldNode, FragmentSpreadNode
 
 
 def getDbPoolFromContext(info:GraphQLResolveInfo) -> Pool:
@@ -46,6 +49,54 @@ def getDbPoolFromContext(info:GraphQLResolveInfo) -> Pool:
 	return None
 
 
+def getDbConnFromContext(info:GraphQLResolveInfo) -> RequestConnection:
+	"""Extract the shared database connection of the current request
+
+	Args:
+		info (GraphQLResolveInfo): Input resolve info
+
+	Returns:
+		RequestConnection: Request connection or None if error
+	"""
+	try:
+		return info.context['request'].state.dbConn
+	except Exception as e:
+		logger.error(e)
+	return None
+
+
+def getLoadersFromContext(info:GraphQLResolveInfo) -> Loaders:
+	"""Extract the DataLoader instances of the current request
+
+	Args:
+		info (GraphQLResolveInfo): Input resolve info
+
+	Returns:
+		Loaders: Request loaders or None if error
+	"""
+	try:
+		return info.context['loaders']
+	except Exception as e:
+		logger.error(e)
+	return None
+
+
+def getReferenceCacheFromContext(info:GraphQLResolveInfo) -> ReferenceCache:
+	"""Extract the reference table cache from FastAPI app state
+
+	Args:
+		info (GraphQLResolveInfo): Input resolve info
+
+	Returns:
+		ReferenceCache: ReferenceCache instance or None
+	"""
+	try:
+		return info.context['request'].app.state.referenceCache
+	except Exception as e:
+		logger.error(e)
+	return None
+
+
 def getLoggerFromContext(info:GraphQLResolveInfo) -> logging.Logger:
 	"""Extract the logger object from GraphQLResolveInfo
 
@@ -89,4 +140,37 @@ def getIndicatorFactoryFromContext(info:GraphQLResolveInfo) -> IndicatorFactory:
 	try:
 		return info.context['request'].app.state.indicatorFactory
 	except:
-		raise Exception('Error while getting IndicatorFactory from context')
\ No newline at end of file
+		raise Exception('Error while getting IndicatorFactory from context')
+
+
+def isFieldSelected(info:GraphQLResolveInfo, name:str) -> bool:
+	"""Look ahead if a sub field of the current field is requested
+
+	Args:
+		info (GraphQLResolveInfo): Input resolve info
+		name (str): Name of the sub field
+
+	Returns:
+		bool: True if the sub field is part of the selection set
+	"""
+	def search(selectionSet:SelectionSetNode) -> bool:
+		if selectionSet == None:
+			return False
+		for selection in selectionSet.selections:
+			if isinstance(selection, FieldNode):
+				if selection.name.value == name:
+					return True
+			elif isinstance(selection, FragmentSpreadNode):
+				fragment = info.fragments.get(selection.name.value)
+				if fragment != None and search(fragment.selection_set):
+					return True
+			elif search(selection.selection_set):
+				# Inline fragment
+				return True
+		return False
+
+	try:
+		return any(search(node.selection_set) for node in info.field_nodes)
+	except Exception as e:
+		logger.error(e)
+	return False
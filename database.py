@@ -19,20 +19,73 @@
  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import os
+import time
+import asyncio
+import logging
 
 # PostgreSQL Database
 import asyncpg
 
 from dataclasses import dataclass
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
 
-# For .env file
-from dotenv import load_dotenv
-load_dotenv()
+# Settings from .env file
+from settings import settings
 
 from log_config import getNewLogger
 
 
+# Records are returned by the resolvers directly, the graphql-core default
+# resolver only uses .get() for Mapping instances
+Mapping.register(asyncpg.Record)
+
+# Seconds to remember a failed reference lookup
+NEGATIVE_CACHE_TTL = 60
+
+# Seconds a worker keeps a found reference id, invalidations of other workers
+# only clear Valkey and become visible after this time
+POSITIVE_CACHE_TTL = 300
+
+# Maximum rows per executemany() call of an upsert
+UPSERT_CHUNK_SIZE = 1000
+
+# Minimum entries to upsert through a COPY into a temporary table
+COPY_THRESHOLD = 100
+
+# Seconds to keep a reference id in Valkey
+VALKEY_CACHE_TTL = 86400
+
+# Reference tables: table -> code column
+REFERENCE_TABLES = {
+	'currencies': 'iso_code',
+	'countries': 'alpha3_code',
+	'exchanges': 'code',
+}
+
+# Valkey key prefixes of the reference tables
+REFERENCE_KEYS = {
+	'currencies': 'cur',
+	'countries': 'cty',
+	'exchanges': 'exc',
+}
+
+# Columns added to existing databases at startup (init.sql only runs on a new database):
+# (table, column, ALTER TABLE statement)
+SCHEMA_MIGRATIONS = [
+	('exchanges', 'virtual', 'ALTER TABLE exchanges ADD COLUMN IF NOT EXISTS virtual BOOLEAN GENERATED ALWAYS AS (CASE WHEN virtual_exchange IS NULL THEN FALSE ELSE (code=virtual_exchange) END) STORED;'),
+]
+
+
+async def _initConnection(con:asyncpg.Connection):
+	"""Warm up a new pool connection before it is handed out
+
+	Args:
+		con (Connection): New database connection
+	"""
+	await con.execute('SELECT 1;')
+
+
 @dataclass
 class SecurityExchangeResult:
 	"""Class to return data and/or errors for sub-database requests"""
@@ -76,28 +129,96 @@ class UpdateResult:
 		self.exception = exception
 
 
+class RequestConnection():
+	"""Pool connection shared by all resolvers of a single request
+
+	The connection is acquired on first use and released by the
+	DatabaseConnectionMiddleware. asyncpg connections can't run
+	concurrent queries, so the usage is serialized with a lock.
+	"""
+
+	def __init__(self, pool:asyncpg.Pool):
+		self.pool = pool
+		self.con:asyncpg.Connection = None
+		self.lock = asyncio.Lock()
+
+
+	@asynccontextmanager
+	async def acquire(self):
+		"""Exclusive usage of the request connection
+
+		Yields:
+			Connection: Database connection
+		"""
+		async with self.lock:
+			if self.con == None:
+				self.con = await self.pool.acquire()
+			yield self.con
+
+
+	async def release(self):
+		"""Give the connection back to the pool"""
+		if self.con != None:
+			con = self.con
+			self.con = None
+			await self.pool.release(con)
+
+
 class DatabaseConnector():
 
-	def __init__(self):
+	def __init__(self, valkeyClient=None):
+		"""Init method
+
+		Args:
+			valkeyClient (Valkey, optional): Async Valkey client for shared caching. Defaults to None.
+		"""
 		self.dbPool:asyncpg.Pool = None
+		self.valkey = valkeyClient
 		self.logger = getNewLogger("database")
+		# Allowed column names per table
+		self.tableColumns:dict[str, frozenset] = {}
+		# Built statements: (operation, table, columns, constraint) -> SQL
+		self.sqlCache:dict[tuple, str] = {}
+		# Column names of the unique constraints
+		self.constraintColumns:dict[str, tuple] = {}
+		# In-process cache for reference ids: table -> {code: (id, expires)}
+		self.referenceCache:dict[str, dict] = {t: {} for t in REFERENCE_TABLES}
+		self.referenceLocks:dict[str, asyncio.Lock] = {t: asyncio.Lock() for t in REFERENCE_TABLES}
 
 
 	async def openPool(self) -> asyncpg.Pool:
 		if self.dbPool == None:
+			serverSettings = {'application_name': 'ascentrade-gql'}
+			statementCacheSize = settings.postgres_statement_cache_size
+			if settings.postgres_pgbouncer:
+				# Transaction pooling: server side statements don't survive a
+				# transaction and PgBouncer rejects unknown startup parameters
+				statementCacheSize = 0
+			else:
+				# JIT slows down the asyncpg type introspection
+				serverSettings['jit'] = 'off'
 			try:
-				self.dbPool = await asyncpg.create_pool('postgresql://{0}:{1}@{2}:{3}/{4}'.format(
-					os.environ.get('postgres_username'),
-					os.environ.get('postgres_password'),
-					os.environ.get('postgres_address'),
-					os.environ.get('postgres_port'),
-					os.environ.get('postgres_database'))
+				self.dbPool = await asyncpg.create_pool(settings.pg_dsn,
+					min_size=settings.postgres_pool_min_size,
+					max_size=settings.postgres_pool_max_size,
+					timeout=settings.postgres_pool_timeout,
+					max_inactive_connection_lifetime=300,
+					command_timeout=60,
+					# Prepared statements are cached per connection, so repeated
+					# resolver/loader queries are only parsed and planned once
+					statement_cache_size=statementCacheSize,
+					max_cacheable_statement_size=settings.postgres_max_cacheable_statement_size,
+					init=_initConnection,
+					server_settings=serverSettings
 				)
 
 				async with self.dbPool.acquire() as con:
 					data = await con.fetchrow('SELECT VERSION();')
 					self.logger.info(f'Connected to {data[0]}')
 
+				await self.migrateSchema()
+				await self.loadTableColumns()
+
 			except Exception as e:
 				self.logger.error('Failed get database connection pool')
 				self.logger.error(e)
@@ -116,13 +237,251 @@ class DatabaseConnector():
 			await self.dbPool.close()
 
 
-	async def getSecurityAndExchange(self, code:str=None, exchange_code:str=None) -> SecurityExchangeResult:
+	def connection(self, con:RequestConnection=None):
+		"""Get a connection context from the request connection or the pool
+
+		Args:
+			con (RequestConnection, optional): Shared request connection. Defaults to None.
+
+		Returns:
+			Async context manager yielding a Connection
+		"""
+		return con.acquire() if con != None else self.dbPool.acquire()
+
+
+	async def migrateSchema(self):
+		"""Add missing columns of SCHEMA_MIGRATIONS to an existing database
+
+		Only missing columns are altered, so the table lock is not taken on every start.
+		"""
+		async with self.dbPool.acquire() as con:
+			for table, column, statement in SCHEMA_MIGRATIONS:
+				try:
+					exists = await con.fetchval("""SELECT EXISTS (SELECT 1 FROM information_schema.columns
+												WHERE table_schema=current_schema() AND table_name=$1 AND column_name=$2);""", table, column)
+					if exists == False:
+						self.logger.info(f'Add column {table}.{column}')
+						await con.execute(statement)
+				except Exception as e:
+					self.logger.error(f'Failed to add column {table}.{column}')
+					self.logger.error(e)
+
+
+	async def loadTableColumns(self):
+		"""Read the column names of all tables once at startup"""
+		async with self.dbPool.acquire() as con:
+			rows = await con.fetch("""SELECT table_name, column_name FROM information_schema.columns
+										WHERE table_schema=current_schema();""")
+		tables = {}
+		for r in rows:
+			tables.setdefault(r['table_name'], set()).add(r['column_name'])
+		self.tableColumns = {t: frozenset(c) for t, c in tables.items()}
+		self.sqlCache.clear()
+
+
+	async def getStatement(self, operation:str, table:str, columns:tuple, constraint:str=None) -> str:
+		"""Get a cached SQL statement for a table and column layout
+
+		Args:
+			operation (str): 'insert', 'update' or 'upsert'
+			table (str): Database table name
+			columns (tuple): Column names in the order of the statement parameters
+			constraint (str, optional): Constraint name for 'upsert'. Defaults to None.
+
+		Raises:
+			Exception: If a column doesn't exist in the table.
+
+		Returns:
+			str: SQL statement
+		"""
+		key = (operation, table, columns, constraint)
+		statement = self.sqlCache.get(key)
+		if statement != None:
+			return statement
+
+		# Column names are part of the statement, only allow existing ones
+		allowed = await self.getTableColumns(table)
+		for c in columns:
+			if c not in allowed:
+				raise Exception(f'Unknown column {c} in table {table}')
+
+		placeholder = ','.join([ f'${i}' for i in range(1, len(columns)+1) ])
+		if operation == 'insert':
+			# INSERT INTO securities (code,name,type,exchange,currency,country) VALUES ($1,$2,$3,$4,$5,$6) RETURNING id;
+			statement = f'INSERT INTO {table} ({",".join(columns)}) VALUES ({placeholder}) RETURNING id;'
+		elif operation == 'update':
+			setClause = ', '.join([f'{c} = COALESCE(${i}, {c})' for i, c in enumerate(columns, 1)])
+			statement = f'UPDATE {table} SET {setClause} WHERE id=${len(columns)+1};'
+		elif operation == 'upsert':
+			excluded = ','.join([f'{c}=EXCLUDED.{c}' for c in columns])
+			statement = f'INSERT INTO {table} ({",".join(columns)}) VALUES ({placeholder}) ON CONFLICT ON CONSTRAINT {constraint} DO UPDATE SET {excluded};'
+		elif operation == 'stage':
+			# CREATE TEMP TABLE quotes_stage ON COMMIT DROP AS SELECT security,date,close FROM quotes WITH NO DATA;
+			statement = f'CREATE TEMP TABLE {table}_stage ON COMMIT DROP AS SELECT {",".join(columns)} FROM {table} WITH NO DATA;'
+		elif operation == 'upsert_stage':
+			excluded = ','.join([f'{c}=EXCLUDED.{c}' for c in columns])
+			statement = f'INSERT INTO {table} ({",".join(columns)}) SELECT {",".join(columns)} FROM {table}_stage ON CONFLICT ON CONSTRAINT {constraint} DO UPDATE SET {excluded};'
+		else:
+			raise Exception(f'Unknown SQL operation {operation}')
+
+		self.sqlCache[key] = statement
+		return statement
+
+
+	async def getConstraintColumns(self, constraint:str, con:RequestConnection=None) -> tuple:
+		"""Get the column names of a constraint (cached after the first call)
+
+		Args:
+			constraint (str): Constraint name
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
+
+		Returns:
+			tuple: Column names, empty if the constraint does not exist
+		"""
+		columns = self.constraintColumns.get(constraint)
+		if columns == None:
+			async with self.connection(con) as connection:
+				rows = await connection.fetch("""SELECT a.attname FROM pg_constraint c
+											JOIN pg_attribute a ON a.attrelid=c.conrelid AND a.attnum=ANY(c.conkey)
+											WHERE c.conname=$1;""", constraint)
+			columns = tuple([r['attname'] for r in rows])
+			if len(columns) > 0:
+				self.constraintColumns[constraint] = columns
+		return columns
+
+
+	async def copyUpsert(self, table:str, columns:tuple, tupleList:list[tuple], constraint:str, con:RequestConnection=None) -> bool:
+		"""Upsert many entries with a binary COPY into a temporary table
+
+		Args:
+			table (str): Database table name
+			columns (tuple): Column names in the order of the tuples
+			tupleList (list[tuple]): Entries
+			constraint (str): Name of the database table constraint for conflict update
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
+
+		Returns:
+			bool: False if the entries can't be staged and nothing was written
+		"""
+		keyColumns = await self.getConstraintColumns(constraint, con=con)
+		if len(keyColumns) == 0 or any(c not in columns for c in keyColumns):
+			return False
+
+		# One statement can't update a row twice, keep the last entry per key like executemany()
+		keyIndices = [columns.index(c) for c in keyColumns]
+		unique = {tuple([t[i] for i in keyIndices]): t for t in tupleList}
+
+		stageSql = await self.getStatement('stage', table, columns)
+		upsertSql = await self.getStatement('upsert_stage', table, columns, constraint)
+		async with self.connection(con) as connection:
+			async with connection.transaction():
+				await connection.execute(stageSql)
+				await connection.copy_records_to_table(f'{table}_stage', records=unique.values(), columns=columns)
+				await connection.execute(upsertSql)
+		return True
+
+
+	async def getTableColumns(self, table:str) -> frozenset:
+		"""Get the column names of a table (cached after the first call)
+
+		Args:
+			table (str): Database table name
+
+		Returns:
+			frozenset: Column names, empty if the table does not exist
+		"""
+		columns = self.tableColumns.get(table)
+		if columns == None:
+			async with self.dbPool.acquire() as con:
+				rows = await con.fetch("""SELECT column_name FROM information_schema.columns
+											WHERE table_schema=current_schema() AND table_name=$1;""", table)
+			columns = frozenset([r['column_name'] for r in rows])
+			if len(columns) > 0:
+				self.tableColumns[table] = columns
+		return columns
+
+
+	async def getReferenceId(self, table:str, code:str, con:RequestConnection=None) -> int:
+		"""Query the ID of a reference table entry by its code (cached)
+
+		Args:
+			table (str): Reference table name (see REFERENCE_TABLES)
+			code (str): Upper case code of the entry
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
+
+		Returns:
+			int: Valid id of the entry or None if not found.
+		"""
+		cache = self.referenceCache[table]
+		entry = cache.get(code)
+		if entry != None and entry[1] > time.monotonic():
+			return entry[0]
+
+		async with self.referenceLocks[table]:
+			# Another task may have filled the cache in the meantime
+			entry = cache.get(code)
+			if entry != None and entry[1] > time.monotonic():
+				return entry[0]
+
+			# Shared cache of all workers
+			id = None
+			key = f'{REFERENCE_KEYS[table]}:{code}'
+			if self.valkey != None:
+				try:
+					raw = await self.valkey.get(key)
+					if raw != None:
+						id = int(raw)
+						cache[code] = (id, time.monotonic() + POSITIVE_CACHE_TTL)
+						return id
+				except Exception as e:
+					self.logger.error(f'Valkey get {key} failed: {e}')
+
+			async with self.connection(con) as connection:
+				id = await connection.fetchval(f'SELECT id FROM {table} WHERE {REFERENCE_TABLES[table]}=$1;', code)
+
+			if id != None and self.valkey != None:
+				try:
+					await self.valkey.set(key, id, ex=VALKEY_CACHE_TTL)
+				except Exception as e:
+					self.logger.error(f'Valkey set {key} failed: {e}')
+			# Keep misses only for a short time
+			cache[code] = (id, time.monotonic() + (POSITIVE_CACHE_TTL if id != None else NEGATIVE_CACHE_TTL))
+			return id
+
+
+	async def invalidateReferenceCache(self, table:str, code:str=None):
+		"""Remove entries from the reference id caches
+
+		Args:
+			table (str): Database table name
+			code (str, optional): Code of the entry. Defaults to None (whole table).
+		"""
+		cache = self.referenceCache.get(table)
+		if cache != None:
+			if code == None:
+				cache.clear()
+			else:
+				cache.pop(code.upper(), None)
+
+			if self.valkey != None:
+				try:
+					if code == None:
+						keys = [k async for k in self.valkey.scan_iter(match=f'{REFERENCE_KEYS[table]}:*')]
+					else:
+						keys = [f'{REFERENCE_KEYS[table]}:{code.upper()}']
+					if len(keys) > 0:
+						await self.valkey.delete(*keys)
+				except Exception as e:
+					self.logger.error(f'Valkey invalidation of {table} failed: {e}')
+
+
+	async def getSecurityAndExchange(self, code:str=None, exchange_code:str=None, con:RequestConnection=None) -> SecurityExchangeResult:
 		"""Function to grab exchange and security IDs from the database
 
 		Args:
-			con (Pool): A single database connection from the pool
 			code (str): Ticker symbol of the stock
 			exchange_code (str): Code of the exchange (e.g. 'NASDAQ') or a virtual exchange code (e.g. 'US')
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
 
 		Returns:
 			SecurityExchangeResult: Dataclass with results
@@ -130,22 +489,22 @@ class DatabaseConnector():
 		result = SecurityExchangeResult(code=code, exchange_code=exchange_code)
 		try:
 			if code != None and len(code) > 0 and exchange_code != None and len(exchange_code) > 0:
-				async with self.dbPool.acquire() as con:
-					data = await con.fetch("""SELECT s.id AS security_id, e.id AS exchange_id FROM securities s JOIN exchanges e ON s.exchange=e.id
-												WHERE s.code=$1 AND (e.code=$2 OR e.virtual_exchange=$2) ORDER BY s.last_update DESC;""", code, exchange_code)
-					# Take the first entry ordered by last_update if any
-					if len(data) >= 1:
-						result.id = data[0]['security_id']
-						result.exchange = data[0]['exchange_id']
-
-					if len(data) == 0:
-						msg = f'Found no matching stocks for getSecurityAndExchange({code}, {exchange_code})'
-						self.logger.debug(msg)
-						result.exception = Exception(msg)
-					elif len(data) > 1:
-						msg = f'Found multiple matching stocks for getSecurityAndExchange({code}, {exchange_code}): {data}, take last updated one!'
-						self.logger.warning(msg)
-						result.exception = Exception(msg)
+				async with self.connection(con) as connection:
+					# The second row only tells about ambiguous listings
+					data = await connection.fetch("""SELECT s.id AS security_id, e.id AS exchange_id FROM securities s JOIN exchanges e ON s.exchange=e.id
+												WHERE s.code=$1 AND (e.code=$2 OR e.virtual_exchange=$2) ORDER BY s.last_update DESC LIMIT 2;""", code, exchange_code)
+				# Take the last updated entry if any
+				if len(data) >= 1:
+					result.id = data[0]['security_id']
+					result.exchange = data[0]['exchange_id']
+				if len(data) == 0:
+					msg = f'Found no matching stocks for getSecurityAndExchange({code}, {exchange_code})'
+					self.logger.debug(msg)
+					result.exception = Exception(msg)
+				elif len(data) > 1:
+					msg = f'Found multiple matching stocks for getSecurityAndExchange({code}, {exchange_code}), take last updated one!'
+					self.logger.warning(msg)
+					result.exception = Exception(msg)
 			else:
 				raise Exception('Invalid input data for getSecurityAndExchange()')
 		except Exception as e:
@@ -154,12 +513,12 @@ class DatabaseConnector():
 		return result
 
 
-	async def getCurrencyId(self, isoCode:str) -> int:
+	async def getCurrencyId(self, isoCode:str, con:RequestConnection=None) -> int:
 		"""Query a currency ID from the database
 
 		Args:
-			con (Connection): Database connection from pool
 			isoCode (str): ISO3 code of a currency.
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
 
 		Raises:
 			Exception: If currency ISO code is None or wrong length.
@@ -170,9 +529,7 @@ class DatabaseConnector():
 		id = None
 		try:
 			if isoCode != None and len(isoCode) == 3:
-				async with self.dbPool.acquire() as con:
-					data = await con.fetch('SELECT id FROM currencies WHERE iso_code=$1;', isoCode.upper())
-					id = data[0]['id'] if len(data) == 1 else None
+				id = await self.getReferenceId('currencies', isoCode.upper(), con)
 			else:
 				raise Exception('Invalid currency ISO code')
 		except Exception as e:
@@ -180,12 +537,12 @@ class DatabaseConnector():
 		return id
 
 
-	async def getCountryId(self, alpha3:str) -> int:
+	async def getCountryId(self, alpha3:str, con:RequestConnection=None) -> int:
 		"""Query a country ID from the database
 
 		Args:
-			con (Connection): Database connection from pool
 			alpha3 (str): Alpha3 code of a country.
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
 
 		Raises:
 			Exception: If country alpha3 is None or wrong length.
@@ -196,9 +553,7 @@ class DatabaseConnector():
 		id = None
 		try:
 			if alpha3 != None and len(alpha3) == 3:
-				async with self.dbPool.acquire() as con:
-					data = await con.fetch('SELECT id FROM countries WHERE alpha3_code=$1;', alpha3.upper())
-					id = data[0]['id'] if len(data) == 1 else None
+				id = await self.getReferenceId('countries', alpha3.upper(), con)
 			else:
 				raise Exception('Invalid country alpha3 code')
 		except Exception as e:
@@ -206,12 +561,12 @@ class DatabaseConnector():
 		return id
 
 
-	async def getExchangeId(self, code:str) -> int:
+	async def getExchangeId(self, code:str, con:RequestConnection=None) -> int:
 		"""Query a exchange ID from the database
 
 		Args:
-			con (Connection): Database connection from pool
 			code (str): Exchange code
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
 
 		Raises:
 			Exception: If exchange code is invalid.
@@ -222,9 +577,7 @@ class DatabaseConnector():
 		id = None
 		try:
 			if code != None:
-				async with self.dbPool.acquire() as con:
-					data = await con.fetch('SELECT id FROM exchanges WHERE code=$1;', code.upper())
-					id = data[0]['id'] if len(data) == 1 else None
+				id = await self.getReferenceId('exchanges', code.upper(), con)
 			else:
 				raise Exception('Invalid exchange code')
 		except Exception as e:
@@ -232,104 +585,143 @@ class DatabaseConnector():
 		return id
 
 
-	async def updateTable(self, table:str, id:int, data:dict, excludeKeys:list=['id']) -> UpdateResult:
+	async def updateTable(self, table:str, id:int, data:dict, excludeKeys:list=['id'], con:RequestConnection=None) -> UpdateResult:
 		"""Update an entry in a database table
 
 		Args:
-			con (Connection): Connection from the pool
 			table (str): Database table name
 			id (int): ID of the entry
 			data (dict): Data to update
 			excludeKeys (list, optional): Keys to ignore in the update. Defaults to ['id'].
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
 
 		Returns:
 			UpdateResult: {'success':bool, 'exception:Exception, id:int}
 		"""
-		self.logger.debug(f'updateTable({table}, {id}, {data}, {excludeKeys})')
+		if self.logger.isEnabledFor(logging.DEBUG):
+			self.logger.debug('updateTable(%s, %s, %s, %s)', table, id, data, excludeKeys)
 		try:
+			# Column names are part of the statement, only allow existing ones
+			allowed = await self.getTableColumns(table)
+			columns = []
 			errors = []
 			for key in data.keys():
 				if key not in excludeKeys:
-					try:
-						statement = f'UPDATE {table} SET {key} = COALESCE($1, {key}) WHERE id=$2;'
-						async with self.dbPool.acquire() as con:
-							await con.execute(statement, data[key], id)
-					except Exception as e:
+					if key in allowed:
+						columns.append(key)
+					else:
+						e = Exception(f'Unknown column {key} in table {table}')
 						self.logger.error(e)
 						errors.append(e)
+
+			if len(columns) > 0:
+				columns = tuple(sorted(columns))
+				statement = await self.getStatement('update', table, columns)
+				async with self.connection(con) as connection:
+					await connection.execute(statement, *[data[c] for c in columns], id)
+				await self.invalidateReferenceCache(table)
 			# Return True or the first error
 			return UpdateResult(True if len(errors)==0 else False, id, None if len(errors)==0 else errors[0])
 		except Exception as e:
+			self.logger.error(e)
 			return UpdateResult(exception=e)
 
 
-	async def insertEntry(self, table:str, data:dict, excludeKeys:list=[]) -> UpdateResult:
+	async def insertEntry(self, table:str, data:dict|list[dict], excludeKeys:list=[], con:RequestConnection=None) -> UpdateResult:
 		"""Insert a new entry into a database table
 
 		Args:
-			con (Connection): Connection from the pool
 			table (str): Database table name
-			data (dict): Data dictionary
+			data (dict|list[dict]): Data dictionary or a list of them for a bulk insert (no id returned)
 			excludeKeys (list, optional): Keys to ignore in the insert. Defaults to [].
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
 
 		Returns:
 			UpdateResult: {'success':bool, 'exception:Exception, id:int}
 		"""
-		self.logger.debug(f'insertEntry({table}, {data}, {excludeKeys})')
+		if isinstance(data, list):
+			if len(data) == 0:
+				return UpdateResult(exception='No entries to insert in list')
+			columns = [k for k in data[0].keys() if k not in excludeKeys]
+			return await self.bulkInsert(table, columns, [tuple([d[c] for c in columns]) for d in data], con)
+
+		if self.logger.isEnabledFor(logging.DEBUG):
+			self.logger.debug('insertEntry(%s, %s, %s)', table, list(data.keys()), excludeKeys)
 		try:
-			# Cleanup data dictionary
-			for k in excludeKeys:
-				if k in data.keys():
-					del data[k]
-			# Prepare statement
-			columns = ','.join(data.keys())
-			placeholder = ','.join([ f'${i}' for i in range(1,len(data.keys())+1) ])
-			# INSERT INTO securities (code,name,type,exchange,currency,country) VALUES ($1,$2,$3,$4,$5,$6) RETURNING id;
-			statement = f'INSERT INTO {table} ({columns}) VALUES ({placeholder}) RETURNING id;'
-			async with self.dbPool.acquire() as con:
-				result = await con.fetch(statement, *data.values())
-				return UpdateResult(True, result[0]['id'])
+			columns = tuple(sorted([k for k in data.keys() if k not in excludeKeys]))
+			statement = await self.getStatement('insert', table, columns)
+			async with self.connection(con) as connection:
+				newId = await connection.fetchval(statement, *[data[c] for c in columns])
+			# A previous miss may be cached
+			await self.invalidateReferenceCache(table)
+			return UpdateResult(True, newId)
 		except Exception as e:
 			self.logger.error(e)
 			return UpdateResult(exception=e)
 
 
-	async def forceUpdateEntries(self, table:str, identifier:dict, data:list[dict], constraint:str) -> UpdateResult:
+	async def bulkInsert(self, table:str, columns:list[str], records:list[tuple], con:RequestConnection=None) -> UpdateResult:
+		"""Insert many rows with the binary COPY protocol
+
+		Args:
+			table (str): Database table name
+			columns (list[str]): Column names in the order of the record fields
+			records (list[tuple]): Rows to insert
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
+
+		Returns:
+			UpdateResult: {'success':bool, 'exception:Exception}
+		"""
+		if self.logger.isEnabledFor(logging.DEBUG):
+			self.logger.debug('bulkInsert(%s, %s, %d entries)', table, columns, len(records))
+		try:
+			async with self.connection(con) as connection:
+				await connection.copy_records_to_table(table, columns=columns, records=records)
+			await self.invalidateReferenceCache(table)
+			return UpdateResult(True)
+		except Exception as e:
+			self.logger.error(e)
+			return UpdateResult(exception=e)
+
+
+	async def forceUpdateEntries(self, table:str, identifier:dict, data:list[dict], constraint:str, con:RequestConnection=None) -> UpdateResult:
 		"""Force update entries in a table
 
 		Args:
-			con (Connection): Database connection from the pool
 			table (str): Database table name
 			identifier (dict): Dict to add to every **data** element
 			data (list): List with objects to update
 			constraint (str): Name of the database table constraint for conflict update
+			con (RequestConnection, optional): Shared request connection. Defaults to None (pool).
 
 		Returns:
 			UpdateResult: {'success':bool, 'exception:Exception}
 		"""
 		try:
-			self.logger.debug(f'forceUpdateEntries: {table}, {identifier}, {len(data)} entries')
+			if self.logger.isEnabledFor(logging.DEBUG):
+				self.logger.debug('forceUpdateEntries: %s, %s, %d entries', table, identifier, len(data))
 			if len(data) > 0:
-				#for entry in data:
-				firstEntry = identifier | data[0]
-				order = firstEntry.keys()
-				#self.logger.debug(f'update {table} with {entry}')
-				columns = ','.join(order)
-				excluded = ','.join([f'{k}=EXCLUDED.{k}' for k in order])
-				# ($1, $2, $3)
-				placeholder = '(' + ','.join([ f'${i}' for i in range(1, len(order)+1) ]) + ')'
-				sql = f'''INSERT INTO {table} ({columns}) VALUES {placeholder} ON CONFLICT ON CONSTRAINT {constraint} DO UPDATE SET {excluded};'''
+				# Fixed identifier prefix followed by the entry fields of the first entry
+				identOrder = tuple(sorted(identifier.keys()))
+				identValues = tuple([identifier[k] for k in identOrder])
+				entryOrder = tuple(sorted([k for k in data[0].keys() if k not in identifier]))
+				sql = await self.getStatement('upsert', table, identOrder + entryOrder, constraint)
 
 				# Create a list of tuples with the data
-				tupleList = []
-				for entry in data:
-					d = identifier | entry
-					# Tuple contains data in the same order like the first entry
-					tupleList.append(tuple([d[field] for field in order]))
-
-				# Database write
-				async with self.dbPool.acquire() as con:
-					await con.executemany(sql, tupleList)
+				tupleList = [identValues + tuple([entry[k] for k in entryOrder]) for entry in data]
+
+				# Large inputs through COPY, otherwise in chunks within one transaction
+				if len(tupleList) >= COPY_THRESHOLD and await self.copyUpsert(table, identOrder + entryOrder, tupleList, constraint, con=con):
+					await self.invalidateReferenceCache(table)
+					return UpdateResult(True)
+				async with self.connection(con) as connection:
+					if len(tupleList) <= UPSERT_CHUNK_SIZE:
+						await connection.executemany(sql, tupleList)
+					else:
+						async with connection.transaction():
+							for i in range(0, len(tupleList), UPSERT_CHUNK_SIZE):
+								await connection.executemany(sql, tupleList[i:i+UPSERT_CHUNK_SIZE])
+				await self.invalidateReferenceCache(table)
 				return UpdateResult(True)
 			else:
 				return UpdateResult(exception='No entries to update in list')
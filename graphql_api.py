@@ -19,19 +19,26 @@
  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import os
-from utils import parseBoolean
+import orjson
+from decimal import Decimal
+from asyncpg import Record
+from utils import LRUCache
+from loaders import Loaders
 from log_config import getNewLogger
 
-# For .env file
-from dotenv import load_dotenv
-load_dotenv()
+# Settings from .env file
+from settings import settings
 
 # GraphQL
-from graphql import GraphQLError
+from graphql import GraphQLError, GraphQLSchema, DocumentNode, parse, validate
 from ariadne import load_schema_from_path, format_error
 from ariadne_graphql_modules import make_executable_schema
 from ariadne.asgi import GraphQL
+from ariadne.asgi.handlers import GraphQLHTTPHandler
+
+# ASGI
+from starlette.requests import Request
+from starlette.responses import Response
 
 # Custom Scalars
 from scalars import custom_scalars
@@ -40,22 +47,132 @@ from scalars import custom_scalars
 from resolvers import custom_resolvers
 
 
+def orjsonDefault(obj):
+	"""Fallback for types orjson can't serialize natively
+
+	Args:
+		obj (Any): Value to serialize
+
+	Raises:
+		TypeError: Unsupported type
+
+	Returns:
+		Any: Serializable value
+	"""
+	if isinstance(obj, Decimal):
+		return str(obj)
+	if isinstance(obj, Record):
+		return dict(obj)
+	raise TypeError
+
+
+class ORJSONHTTPHandler(GraphQLHTTPHandler):
+	"""GraphQL HTTP handler parsing the requests and serializing the results with orjson"""
+
+	async def extract_data_from_json_request(self, request:Request) -> dict:
+		try:
+			return orjson.loads(await request.body())
+		except orjson.JSONDecodeError:
+			# E.g. integers beyond 64 bit, let the default parser decide
+			return await super().extract_data_from_json_request(request)
+
+
+	async def create_json_response(self, request:Request, result:dict, success:bool) -> Response:
+		return Response(
+			orjson.dumps(result, default=orjsonDefault),
+			status_code=200 if success else 400,
+			media_type='application/json'
+		)
+
+
 class GraphQLApi():
 	def __init__(self):
+		gqlLogger = getNewLogger('gql')
+		self.logger = gqlLogger
+
 		# Create executable schema instance
 		self.type_defs = load_schema_from_path("./schema/common.gql")
 		self.schema = make_executable_schema(self.type_defs, *custom_scalars, *custom_resolvers)
 
-		gqlLogger = getNewLogger('gql')
+		# Parsed documents and validation results of already known queries
+		self.parseCache = LRUCache(maxsize=1024)
+		self.validationCache = LRUCache(maxsize=1024)
 
 		self.gqlApp = GraphQL(
 			self.schema,
+			context_value=self.getContextValue,
+			query_parser=self.cachedParser,
+			query_validator=self.cachedValidator,
+			http_handler=ORJSONHTTPHandler(),
 			logger=gqlLogger,
 			error_formatter=self.customErrorFormatter,
-			debug=parseBoolean(os.environ.get('debug')),
-			introspection=parseBoolean(os.environ.get('introspection'))
+			debug=settings.debug,
+			introspection=settings.introspection
 		)
 
+	def cachedParser(self, context_value, data:dict) -> DocumentNode:
+		"""Query parser with an LRU cache keyed by the query source
+
+		The returned documents are shared between requests, graphql-core
+		does not modify them during validation or execution.
+
+		Args:
+			context_value (Any): GraphQL context of the request
+			data (dict): GraphQL request data
+
+		Returns:
+			DocumentNode: Parsed query
+		"""
+		query = data['query']
+		document = self.parseCache.get(query)
+		if document == None:
+			# Syntax errors are raised and not cached
+			document = parse(query)
+			self.parseCache.put(query, document)
+		return document
+
+
+	def cachedValidator(self, schema:GraphQLSchema, document_ast:DocumentNode, rules=None, max_errors=None, type_info=None) -> list[GraphQLError]:
+		"""Query validator with an LRU cache keyed by the query source
+
+		Args:
+			schema (GraphQLSchema): Executable schema
+			document_ast (DocumentNode): Parsed query
+			rules (Collection, optional): Validation rules. Defaults to None.
+			max_errors (int, optional): Maximum number of errors. Defaults to None.
+			type_info (TypeInfo, optional): Type info. Defaults to None.
+
+		Returns:
+			list[GraphQLError]: Validation errors
+		"""
+		if document_ast.loc == None or type_info != None:
+			return validate(schema, document_ast, rules=rules, max_errors=max_errors, type_info=type_info)
+
+		key = (document_ast.loc.source.body, tuple(rules) if rules != None else None, max_errors)
+		errors = self.validationCache.get(key)
+		if errors == None:
+			errors = validate(schema, document_ast, rules=rules, max_errors=max_errors)
+			self.validationCache.put(key, errors)
+		return errors
+
+
+	@staticmethod
+	def getContextValue(request:Request, data:dict=None) -> dict:
+		"""Create the GraphQL context of a request
+
+		Args:
+			request (Request): Starlette request
+			data (dict, optional): GraphQL request data. Defaults to None.
+
+		Returns:
+			dict: Context with the request and the request scoped DataLoaders
+		"""
+		return {
+			'request': request,
+			'loaders': Loaders(request.state.dbConn)
+		}
+
+
 	@staticmethod
 	def customErrorFormatter(error: GraphQLError, debug: bool = False) -> dict:
 		"""Custom GraphQL error formatter for Ariadne. Docs: https://ariadnegraphql.org/docs/error-messaging
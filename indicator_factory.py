@@ -19,16 +19,18 @@
  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import re
 import json
 from enum import Enum
 import logging
-import os
-from asyncpg import Pool
-import psycopg2
-from datetime import datetime
-import multiprocessing
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import execute_values
+from datetime import date
+from dataclasses import dataclass
+from typing import Callable
 
 from indicators.indicators import *
+import indicators.indicators as baseIndicators
 # Add or overwrite base indicators with custom Python
 try:
 	from custom_indicators import *
@@ -39,6 +41,7 @@ from log_config import getNewLogger
 from logging import Logger
 
 from database import DatabaseConnector
+from settings import settings
 
 
 class Interval(Enum):
@@ -72,6 +75,99 @@ def intervalFromStr(input:str) -> Interval:
 		raise NotImplementedError
 
 
+@dataclass(frozen=True, slots=True)
+class IndicatorEntry:
+	"""Preparsed entry of the indicator configuration"""
+	config: dict
+	interval: Interval
+	function: Callable
+	parameters: dict
+	mapping: dict
+	mappingKeys: frozenset
+	fastFunction: Callable = None
+	fastColumn: str = None
+
+
+# Numeric indicator parameters given as strings
+_INT_RE = re.compile(r'[+-]?\d+')
+_FLOAT_RE = re.compile(r'[+-]?(\d+\.\d*|\.\d+|\d+)([eE][+-]?\d+)?')
+
+# Trivial indicators which are assigned directly: function -> (values function, output key)
+FAST_INDICATORS = {
+	baseIndicators.Slope: (baseIndicators.slopeValues, 'slope'),
+	baseIndicators.Larger: (baseIndicators.largerValues, 'larger'),
+}
+
+# Quote columns which are not stored as indicators
+QUOTE_COLUMNS = frozenset(['date','open','high','low','close','split_adjusted_open','split_adjusted_high','split_adjusted_low','split_adjusted_close','adjusted_close','volume'])
+
+# Quote columns stored as float64
+QUOTE_FLOAT_COLUMNS = QUOTE_COLUMNS - {'date'}
+
+# Aggregation of daily quotes to weekly/monthly candles
+RESAMPLE_AGGREGATION = {
+	'date': 'last',
+	'open': 'first',
+	'high': 'max',
+	'low': 'min',
+	'close': 'last',
+	'split_adjusted_open': 'first',
+	'split_adjusted_high': 'max',
+	'split_adjusted_low': 'min',
+	'split_adjusted_close': 'last',
+	'adjusted_close': 'last',
+	'volume': 'sum'
+}
+
+# Rows per INSERT statement when writing indicators
+UPSERT_PAGE_SIZE = 500
+
+# Upsert statements of the current worker process by column names (see getUpsertStatement)
+_upsertStatements:dict[tuple, str] = {}
+
+# psycopg2 connection pool of the current worker process (see initWorker)
+_workerPool:ThreadedConnectionPool = None
+
+# Preparsed indicator configuration of the current worker process (see setWorkerConfig)
+_workerConfig:tuple[list, set] = None
+
+
+def initWorker(minConnections:int=1, maxConnections:int=2):
+	"""Initializer for worker processes, e.g. multiprocessing.Pool(initializer=initWorker).
+
+	Creates one psycopg2 connection pool per process, so the connection is reused
+	by all calculations of this worker.
+
+	Args:
+		minConnections (int, optional): Minimum number of connections. (Defaults to 1)
+		maxConnections (int, optional): Maximum number of connections. (Defaults to 2)
+	"""
+	global _workerPool
+	_workerPool = ThreadedConnectionPool(
+		minConnections,
+		maxConnections,
+		database=settings.postgres_database,
+		user=settings.postgres_username,
+		password=settings.postgres_password,
+		host=settings.postgres_address,
+		port=settings.postgres_port
+	)
+
+
+def setWorkerConfig(config:dict):
+	"""Parse the indicator configuration once per worker process.
+
+	Used in the process pool initializer, so the configuration is pickled once per
+	worker and not for every job.
+
+	Args:
+		config (dict): Indicator configuration (see indicators.json).
+	"""
+	global _workerConfig
+	entries = IndicatorFactory.prepareConfig(config)
+	_workerConfig = (entries, IndicatorFactory.getNeededIntervals(entries))
+
+
 class IndicatorFactory():
 	"""Class for automated calculation and storage of financial indicators.
 	"""
@@ -94,6 +190,15 @@ class IndicatorFactory():
 				'securities':[]
 			}
 
+		# Parse the configuration only once, errors are raised again at calculation
+		try:
+			self.entries = self.prepareConfig(self.config)
+			self.neededIntervals = self.getNeededIntervals(self.entries)
+		except Exception as e:
+			self.logger.error(e)
+			self.entries = None
+			self.neededIntervals = None
+
 	@staticmethod
 	def resampleDataFrame(data:pd.DataFrame, interval:Interval) -> pd.DataFrame:
 		"""Resample daily/weekly quotes to weekly/monthly candles.
@@ -103,48 +208,184 @@ class IndicatorFactory():
 			interval (Interval): Interval Enum for resampling.
 
 		Returns:
-			pd.DataFrame: Resampled Pandas DataFrame.
+			pd.DataFrame: Resampled Pandas DataFrame (the input DataFrame itself for daily intervals).
 		"""
-		df = data.copy()
-		if interval == Interval.WEEKLY or interval == Interval.MONTHLY:
-			delta = '1W' if interval == Interval.WEEKLY else 'ME'
-			df = df.resample(rule=delta, on='date').agg({
-				'date': 'last',
-				'open': 'first', 
-				'high': 'max', 
-				'low': 'min', 
-				'close': 'last',
-				'split_adjusted_open': 'first',
-				'split_adjusted_high': 'max',
-				'split_adjusted_low': 'min',
-				'split_adjusted_close': 'last',
-				'adjusted_close': 'last',
-				'volume': 'sum'
-			})
+		if interval == Interval.DAILY:
+			return data
+		# Group by integer period keys, same bins as resample('1W') and resample('ME')
+		dates = data['date'].to_numpy()
+		if interval == Interval.WEEKLY:
+			# datetime64[W] weeks start on Thursday, shift to weeks from Monday to Sunday
+			key = (dates.astype('datetime64[D]').astype(np.int64) + 3) // 7
+		else:
+			key = dates.astype('datetime64[M]').astype(np.int64)
+		df = data.groupby(key, sort=True).agg(RESAMPLE_AGGREGATION)
+		# resample() also returns empty periods, e.g. weeks without quotes
+		if len(df) > 0 and len(df) != df.index[-1] - df.index[0] + 1:
+			df = df.reindex(range(df.index[0], df.index[-1] + 1))
+			df['volume'] = df['volume'].fillna(0.0)
 		df.index = range(len(df))
 		return df
 
+	@staticmethod
+	def quotesToDataFrame(columns:list[str], rows:list) -> pd.DataFrame:
+		"""Create a column-major DataFrame from quote rows, price and volume columns are cast to float64 once.
+
+		Args:
+			columns (list[str]): Column names in the order of the row values.
+			rows (list): Rows from the database (tuples or asyncpg records).
+
+		Returns:
+			pd.DataFrame: Pandas DataFrame with the quotes.
+		"""
+		data = {}
+		# Transpose all rows at once instead of indexing every row for each column
+		for column, values in zip(columns, zip(*rows)):
+			data[column] = np.asarray(values, dtype=np.float64) if column in QUOTE_FLOAT_COLUMNS else list(values)
+		return pd.DataFrame(data, copy=False)
+
 	@staticmethod
 	def parseParameters(input:dict) -> dict:
-		"""Parse indicators input parameters from JSON (string) to dict (Decimal).
+		"""Parse indicators input parameters from JSON (string) to dict (int/float).
 
 		Args:
 			input (dict): Input dict.
 
 		Returns:
-			dict: Dict with Decimal parsed values.
+			dict: Dict with int/float parsed numbers, other values unchanged.
 		"""
 		output = {}
 		for k in input.keys():
 			if type(input[k]) == str:
-				if input[k].isdecimal():
-					output[k] = Decimal(input[k])
+				if _INT_RE.fullmatch(input[k]) != None:
+					output[k] = int(input[k])
+				elif _FLOAT_RE.fullmatch(input[k]) != None:
+					output[k] = float(input[k])
 				else:
 					output[k] = input[k]
 			else:
 				output[k] = input[k]
 		return output
 
+	@staticmethod
+	def prepareConfig(config:dict) -> list[IndicatorEntry]:
+		"""Parse the indicator configuration once for all calculations.
+
+		Args:
+			config (dict): Indicator configuration (see indicators.json).
+
+		Raises:
+			NotImplementedError: Unknown/not implemented interval.
+			KeyError: Unknown indicator function.
+
+		Returns:
+			list[IndicatorEntry]: Preparsed configuration entries.
+		"""
+		entries = []
+		for obj in config['securities']:
+			function = globals()[obj['indicator']]
+			mappingKeys = frozenset(obj['mapping'].keys())
+			# Skip the DataFrame handling (and the copy by rename) for trivial indicators
+			fastFunction, fastColumn = None, None
+			if function in FAST_INDICATORS:
+				valuesFunction, key = FAST_INDICATORS[function]
+				if mappingKeys <= {key}:
+					fastFunction = valuesFunction
+					fastColumn = obj['mapping'].get(key)
+			entries.append(IndicatorEntry(
+				config=obj,
+				interval=intervalFromStr(obj['interval']),
+				function=function,
+				parameters=IndicatorFactory.parseParameters(obj['parameters']),
+				mapping=obj['mapping'],
+				mappingKeys=mappingKeys,
+				fastFunction=fastFunction,
+				fastColumn=fastColumn
+			))
+		return entries
+
+	@staticmethod
+	def getNeededIntervals(entries:list[IndicatorEntry]) -> set[Interval]:
+		"""Get all intervals used by the indicator configuration.
+
+		Args:
+			entries (list[IndicatorEntry]): Preparsed configuration entries.
+
+		Returns:
+			set[Interval]: Set of used Interval Enum values.
+		"""
+		return {entry.interval for entry in entries}
+
+	@staticmethod
+	def calculateIndicators(dfDaily:pd.DataFrame, entries:list[IndicatorEntry], logger:Logger, abortOnFailure:bool=False, neededIntervals:set[Interval]=None) -> tuple[date, dict]:
+		"""Run all configured indicators on the daily quotes of a single security.
+
+		Args:
+			dfDaily (pd.DataFrame): Daily quotes of the security, sorted by date.
+			entries (list[IndicatorEntry]): Preparsed configuration entries (see prepareConfig).
+			logger (Logger): Logger to use.
+			abortOnFailure (bool, optional): Stop at the first unsuccessful indicator. (Defaults to False)
+			neededIntervals (set[Interval], optional): Intervals used by the configuration, calculated if None. (Defaults to None)
+
+		Returns:
+			tuple[date, dict]: Date of the last quote and dict with all indicator values at that date, None if aborted.
+		"""
+		# Parse date string as date
+		dfDaily['date'] = pd.to_datetime(dfDaily['date'])
+		# Calculate weekly and monthly candles only if needed
+		if neededIntervals == None:
+			neededIntervals = IndicatorFactory.getNeededIntervals(entries)
+		dfs = {Interval.DAILY: dfDaily}
+		for interval in (Interval.WEEKLY, Interval.MONTHLY):
+			if interval in neededIntervals:
+				dfs[interval] = IndicatorFactory.resampleDataFrame(dfDaily, interval)
+
+		# Calculate all configured indicators
+		for entry in entries:
+			logger.debug(f'Calculate indicator {entry.config}')
+			if entry.fastFunction != None:
+				try:
+					values = entry.fastFunction(dfs[entry.interval], **entry.parameters)
+					if entry.fastColumn != None:
+						dfs[entry.interval][entry.fastColumn] = values
+					continue
+				except Exception:
+					# Use the indicator function for error handling
+					pass
+			success, df, keys = entry.function(dfs[entry.interval], **entry.parameters)
+			if success == True:
+				# Drop keys which will not be mapped
+				dropKeys = [k for k in keys if k not in entry.mappingKeys]
+				if len(dropKeys) > 0:
+					df = df.drop(dropKeys, axis=1)
+				df = df.rename(columns=entry.mapping)
+				dfs[entry.interval] = df
+			else:
+				logger.warning(f'Calculating indicator {entry.config} was not successful')
+				if abortOnFailure == True:
+					return None
+
+		# Cleanup and merge DataFrame objects as dict
+		data = dict()
+		lastDate = dfs[Interval.DAILY]['date'].iloc[-1].date()
+		for interval, df in dfs.items():
+			# Only the last row is stored, skip the quote columns and convert NaN/NaT to None
+			for k, v in df.iloc[-1].to_dict().items():
+				if k not in QUOTE_COLUMNS:
+					data[k] = None if pd.isna(v) else v
+		return lastDate, data
+
+	def getEntries(self) -> tuple[list[IndicatorEntry], set[Interval]]:
+		"""Get the preparsed configuration, parse it again if it was invalid at init.
+
+		Returns:
+			tuple[list[IndicatorEntry], set[Interval]]: Preparsed configuration entries and the used intervals.
+		"""
+		if self.entries == None:
+			entries = self.prepareConfig(self.config)
+			return entries, self.getNeededIntervals(entries)
+		return self.entries, self.neededIntervals
+
 	async def calculate(self, id:int) -> bool:
 		"""Function to calculate all specified indicators for a security.
 
@@ -157,143 +398,209 @@ class IndicatorFactory():
 		Returns:
 			bool: True/False of success.
 		"""
+		self.logger.debug(f'calculate(id={id})')
+		results = await self.calculateBatch([id])
+		return results[id]
+
+	async def calculateBatch(self, ids:list[int]) -> dict[int, bool]:
+		"""Function to calculate all specified indicators for many securities.
+
+		All quotes are fetched with a single query and split per security.
+
+		Args:
+			ids (list[int]): Primary keys (IDs) of the securities.
+
+		Raises:
+			e: Exception if any.
+
+		Returns:
+			dict[int, bool]: True/False of success for every ID.
+		"""
 		try:
-			self.logger.debug(f'calculate(id={id})')
+			self.logger.debug(f'calculateBatch({len(ids)} IDs)')
+			results = {id: True for id in ids}
+			entries, neededIntervals = self.getEntries()
 			rows = []
 			async with self.dbConnector.dbPool.acquire() as con:
-				# Get all historic quotes for this stock
+				# Get all historic quotes for these stocks
 				# Cast to double precision float for faster calculation
-				rows = await con.fetch("""SELECT date,open::double precision,high::double precision,low::double precision,close::double precision,
+				rows = await con.fetch("""SELECT security,date,open::double precision,high::double precision,low::double precision,close::double precision,
 						   					split_adjusted_open::double precision,split_adjusted_high::double precision,split_adjusted_low::double precision,
-						   					split_adjusted_close::double precision,adjusted_close::double precision,volume
-											FROM quotes WHERE security=$1 ORDER BY date ASC;""", id)
+						   					split_adjusted_close::double precision,adjusted_close::double precision,volume::double precision
+											FROM quotes WHERE security=ANY($1) ORDER BY security ASC, date ASC;""", list(ids))
+			if len(rows) == 0:
+				return results
 			# Convert to Pandas DataFrame
-			dfDaily = pd.DataFrame([dict(row) for row in rows])
-
-			if len(dfDaily) < 10:
-				self.logger.info(f'Skip indicator calculation for ID: {id} (less data)')
-				return True
-
-			# Parse date string as date
-			dfDaily['date'] = pd.to_datetime(dfDaily['date'])
-			# Calculate weekly and monthly candles as well
-			dfWeekly = self.resampleDataFrame(dfDaily, Interval.WEEKLY)
-			dfMonthly = self.resampleDataFrame(dfDaily, Interval.MONTHLY)
-			dfs = [dfDaily, dfWeekly, dfMonthly]
-
-			# Calculate all configured indicators
-			for obj in self.config['securities']:
-				self.logger.debug(f'Calculate indicator {obj}')
-				df:pd.DataFrame = dfs[intervalFromStr(obj['interval']).value]
-				params = self.parseParameters(obj['parameters'])
-				success, df, keys = globals()[obj['indicator']](df, **params)
-				if success == True:
-					# Drop keys which will not be mapped
-					for k in keys:
-						if k not in obj['mapping'].keys():
-							df = df.drop([k], axis=1)
-					df = df.rename(columns=obj['mapping'])
-					dfs[intervalFromStr(obj['interval']).value] = df
-				else:
-					self.logger.warning(f'Calculating indicator {obj} was not successful')
-
-			# Cleanup and merge DataFrame objects as dict
-			data = dict()
-			date = datetime.strptime(np.datetime_as_string(dfs[0]['date'].values[-1], unit='D'), '%Y-%m-%d').date()
-			for i in range(0, len(dfs)):
-				dfs[i] = dfs[i].drop(['date','open','high','low','close','split_adjusted_open','split_adjusted_high','split_adjusted_low','split_adjusted_close','adjusted_close','volume'], axis=1)
-				dfs[i] = dfs[i].replace({np.nan: None})
-				data.update(dfs[i].iloc[-1].to_dict())
-
-			# Update indicators table
-			self.logger.debug(f'Indicator data for security {id} on date {date}: {data}')
-			result = await self.dbConnector.forceUpdateEntries('indicators', {'security':id, 'date':date}, [data], 'indicators_security_date_uq')
-			return result.success
-			
+			dfAll = self.quotesToDataFrame(list(rows[0].keys()), rows)
+
+			for security, dfDaily in dfAll.groupby('security', sort=False):
+				id = int(security)
+				if len(dfDaily) < 10:
+					self.logger.info(f'Skip indicator calculation for ID: {id} (less data)')
+					continue
+				try:
+					dfDaily = dfDaily.drop(['security'], axis=1).reset_index(drop=True)
+					lastDate, data = self.calculateIndicators(dfDaily, entries, self.logger, neededIntervals=neededIntervals)
+
+					# Update indicators table
+					self.logger.debug(f'Indicator data for security {id} on date {lastDate}: {data}')
+					result = await self.dbConnector.forceUpdateEntries('indicators', {'security':id, 'date':lastDate}, [data], 'indicators_security_date_uq')
+					results[id] = result.success
+				except Exception as e:
+					self.logger.error(f'Error while calculating indicators for ID: {id}')
+					self.logger.error(e)
+					results[id] = False
+			return results
+
 		except Exception as e:
 			self.logger.error(e)
 			raise e
 
+	@staticmethod
+	def calculateMultiprocessing(id:int, config:dict=None) -> bool:
+		"""Calculate and store all indicators for a security (in a worker process).
+
+		Args:
+			id (int): Primary key (ID) of the security.
+			config (dict, optional): Indicator configuration (see indicators.json). (Defaults to the configuration of **setWorkerConfig**)
+
+		Returns:
+			bool: True/False of success.
+		"""
+		results = IndicatorFactory.calculateMultiprocessingBatch([id], config)
+		return results.get(id, False)
+
 
 	@staticmethod
-	def calculateMultiprocessing(id:int, config:dict) -> bool:
+	def calculateMultiprocessingBatch(ids:list[int], config:dict=None) -> dict[int, bool]:
+		"""Calculate and store all indicators for many securities (in a worker process).
+
+		All quotes are fetched with a single query, the results are written every
+		UPSERT_PAGE_SIZE securities. The connection is taken from the
+		worker pool created by **initWorker** or, if the process was not initialized,
+		from a temporary pool which is closed afterwards.
+
+		Args:
+			ids (list[int]): Primary keys (IDs) of the securities.
+			config (dict, optional): Indicator configuration (see indicators.json). (Defaults to the configuration of **setWorkerConfig**)
+
+		Returns:
+			dict[int, bool]: True/False of success for every ID.
+		"""
+		global _workerPool
+		logger = logging.getLogger()
+		logger.info(f'calculateMultiprocessingBatch({ids})')
+		results = {id: False for id in ids}
+		temporaryPool = _workerPool == None
 		try:
-			logger = logging.getLogger()
-			logger.info(f'calculateMultiprocessing({id})')
-
-			conn = psycopg2.connect(
-				database=os.environ.get('postgres_database'),
-				user=os.environ.get('postgres_username'), 
-				password=os.environ.get('postgres_password'),
-				host=os.environ.get('postgres_address'),  
-				port=os.environ.get('postgres_port')
-			)
-			
-			cursor = conn.cursor()
-			cursor.execute('''SELECT date,open::double precision,high::double precision,low::double precision,close::double precision,
-						split_adjusted_open::double precision,split_adjusted_high::double precision,split_adjusted_low::double precision,
-						split_adjusted_close::double precision,adjusted_close::double precision,volume::double precision
-						FROM quotes WHERE security=%s ORDER BY date ASC;''', (id,))
-			records = cursor.fetchall()
-			quotes = [dict((cursor.description[i][0], value) for i, value in enumerate(row)) for row in records]
-			logger.debug(f'got {len(records)} quotes for id={id}')
+			if config != None:
+				entries = IndicatorFactory.prepareConfig(config)
+				neededIntervals = IndicatorFactory.getNeededIntervals(entries)
+			elif _workerConfig != None:
+				entries, neededIntervals = _workerConfig
+			else:
+				raise ValueError('No indicator configuration, use setWorkerConfig() or the config argument')
+			if temporaryPool == True:
+				initWorker()
+			conn = _workerPool.getconn()
+			try:
+				cursor = conn.cursor()
+				cursor.execute('''SELECT security,date,open::double precision,high::double precision,low::double precision,close::double precision,
+							split_adjusted_open::double precision,split_adjusted_high::double precision,split_adjusted_low::double precision,
+							split_adjusted_close::double precision,adjusted_close::double precision,volume::double precision
+							FROM quotes WHERE security=ANY(%s) ORDER BY security ASC, date ASC;''', (list(ids),))
+				records = cursor.fetchall()
+				logger.debug(f'got {len(records)} quotes for {len(ids)} IDs')
+
+				# Convert to Pandas DataFrame
+				dfAll = IndicatorFactory.quotesToDataFrame([d[0] for d in cursor.description], records)
+
+				for id in ids:
+					results[id] = True
+				# Rows to write, grouped by their columns
+				writes = {}
+				pending = 0
+				for security, dfDaily in (dfAll.groupby('security', sort=False) if len(dfAll) > 0 else []):
+					id = int(security)
+					if len(dfDaily) < 10:
+						logger.debug(f'Skip indicator calculation for ID: {id} (less data)')
+						continue
+					try:
+						dfDaily = dfDaily.drop(['security'], axis=1).reset_index(drop=True)
+						output = IndicatorFactory.calculateIndicators(dfDaily, entries, logger, abortOnFailure=True, neededIntervals=neededIntervals)
+						if output == None:
+							results[id] = False
+							continue
+						lastDate, data = output
+						data['security'] = id
+						data['date'] = lastDate
+						writeIds, rows = writes.setdefault(tuple(data.keys()), ([], []))
+						writeIds.append(id)
+						rows.append(tuple(data.values()))
+						pending += 1
+						# Flush the buffer every page
+						if pending >= UPSERT_PAGE_SIZE:
+							IndicatorFactory.writeIndicatorRows(conn, writes, results, logger)
+							writes = {}
+							pending = 0
+					except Exception as e:
+						logger.error(e)
+						results[id] = False
+
+				# Write the remaining rows
+				IndicatorFactory.writeIndicatorRows(conn, writes, results, logger)
+				cursor.close()
+			finally:
+				_workerPool.putconn(conn)
 
-			# Convert to Pandas DataFrame
-			dfDaily = pd.DataFrame(quotes)
-
-			if len(dfDaily) < 10:
-				logger.debug(f'Skip indicator calculation for ID: {id} (less data)')
-				return True
-
-			# Parse date string as date
-			dfDaily['date'] = pd.to_datetime(dfDaily['date'])
-			# Calculate weekly and monthly candles as well
-			dfWeekly = IndicatorFactory.resampleDataFrame(dfDaily, Interval.WEEKLY)
-			dfMonthly = IndicatorFactory.resampleDataFrame(dfDaily, Interval.MONTHLY)
-			dfs = [dfDaily, dfWeekly, dfMonthly]
-
-			# Calculate all configured indicators
-			for obj in config['securities']:
-				logger.debug(f'Calculate indicator {obj}')
-				df:pd.DataFrame = dfs[intervalFromStr(obj['interval']).value]
-				params = IndicatorFactory.parseParameters(obj['parameters'])
-				success, df, keys = globals()[obj['indicator']](df, **params)
-				if success == True:
-					# Drop keys which will not be mapped
-					for k in keys:
-						if k not in obj['mapping'].keys():
-							df = df.drop([k], axis=1)
-					df = df.rename(columns=obj['mapping'])
-					dfs[intervalFromStr(obj['interval']).value] = df
-				else:
-					logger.warning(f'Calculating indicator {obj} was not successful')
-					return False
-
-			# Cleanup and merge DataFrame objects as dict
-			data = dict()
-			date = datetime.strptime(np.datetime_as_string(dfs[0]['date'].values[-1], unit='D'), '%Y-%m-%d').date()
-			for i in range(0, len(dfs)):
-				dfs[i] = dfs[i].drop(['date','open','high','low','close','split_adjusted_open','split_adjusted_high','split_adjusted_low','split_adjusted_close','adjusted_close','volume'], axis=1)
-				dfs[i] = dfs[i].replace({np.nan: None})
-				data.update(dfs[i].iloc[-1].to_dict())
-			data['security'] = id
-			data['date'] = date
-			
-			# Write data to database
-			columns = ','.join(data.keys())
-			excluded = ','.join([f'{k}=EXCLUDED.{k}' for k in data.keys()])
-			# (%s, %s, %s)
-			placeholder = '(' + ','.join([ f'%s' for _ in range(1, len(data.keys())+1) ]) + ')'
-			sql = f'''INSERT INTO indicators ({columns}) VALUES {placeholder} ON CONFLICT ON CONSTRAINT indicators_security_date_uq DO UPDATE SET {excluded};'''
-
-			# Database write
-			tupleData = tuple([data[field] for field in data.keys()])
-			cursor.execute(sql, tupleData)
-			conn.commit()
-			cursor.close()
-			conn.close()
-			return True
-		
 		except Exception as e:
 			logger.error(e)
-		return False
\ No newline at end of file
+			for id in ids:
+				results[id] = False
+		finally:
+			if temporaryPool == True and _workerPool != None:
+				_workerPool.closeall()
+				_workerPool = None
+		return results
+
+
+	@staticmethod
+	def getUpsertStatement(keys:tuple) -> str:
+		"""Get the (cached) upsert statement of the indicators table for execute_values.
+
+		Args:
+			keys (tuple): Column names of the rows.
+
+		Returns:
+			str: SQL statement with a single %s placeholder for the values.
+		"""
+		sql = _upsertStatements.get(keys)
+		if sql == None:
+			columns = ','.join(keys)
+			excluded = ','.join([f'{k}=EXCLUDED.{k}' for k in keys])
+			sql = f'''INSERT INTO indicators ({columns}) VALUES %s ON CONFLICT ON CONSTRAINT indicators_security_date_uq DO UPDATE SET {excluded};'''
+			_upsertStatements[keys] = sql
+		return sql
+
+	@staticmethod
+	def writeIndicatorRows(conn, writes:dict[tuple, tuple[list, list]], results:dict[int, bool], logger:Logger):
+		"""Upsert buffered indicator rows with one statement per page.
+
+		Args:
+			conn (connection): psycopg2 database connection.
+			writes (dict[tuple, tuple[list, list]]): Column names mapped to the security IDs and row tuples to write.
+			results (dict[int, bool]): Results per security ID, set to False on errors.
+			logger (Logger): Logger to use.
+		"""
+		cursor = conn.cursor()
+		for keys, (writeIds, rows) in writes.items():
+			try:
+				execute_values(cursor, IndicatorFactory.getUpsertStatement(keys), rows, page_size=UPSERT_PAGE_SIZE)
+				conn.commit()
+			except Exception as e:
+				conn.rollback()
+				logger.error(e)
+				for id in writeIds:
+					results[id] = False
+		cursor.close()
+
@@ -21,12 +21,146 @@
 
 import numpy as np
 import pandas as pd
-from decimal import Decimal
 
 from log_config import logger
 
+# Numba is optional, the kernels run as plain Python without it
+try:
+	from numba import njit
+except ImportError:
+	def njit(*args, **kwargs):
+		if len(args) == 1 and callable(args[0]):
+			return args[0]
+		return lambda f: f
 
-def SimpleMovingAverage(df:pd.DataFrame, period:Decimal, source:str='adjusted_close') -> tuple[bool, pd.DataFrame, list[str]]:
+# Bottleneck is optional, pandas rolling windows are used without it
+try:
+	import bottleneck as bn
+except ImportError:
+	bn = None
+
+
+def _moving(x:np.ndarray, n:int, operation:str) -> np.ndarray:
+	"""Moving window aggregation, NaN until the window contains N valid values
+
+	Max/min use bottleneck if available. Mean/std stay with pandas: the running
+	sums of bottleneck drift on flat windows (std > 0, mean not constant).
+
+	Args:
+		x (np.ndarray): Input values (float64).
+		n (int): Window size.
+		operation (str): One of **mean**, **std** (ddof=0), **max** or **min**.
+
+	Returns:
+		np.ndarray: Aggregated values
+	"""
+	if bn != None and operation in ('max', 'min') and n <= len(x):
+		return getattr(bn, f'move_{operation}')(x, n, min_count=n)
+	rolling = pd.Series(x).rolling(n)
+	if operation == 'std':
+		return rolling.std(ddof=0).to_numpy()
+	return getattr(rolling, operation)().to_numpy()
+
+
+@njit(cache=True)
+def _rma_kernel(x:np.ndarray, n:int) -> np.ndarray:
+	"""Wilder's moving average (RMA) seeded with the mean of the first N changes
+
+	Args:
+		x (np.ndarray): Input values (float64).
+		n (int): Period.
+
+	Returns:
+		np.ndarray: RMA values, NaN before index N
+	"""
+	a = np.full(len(x), np.nan)
+	a[n] = x[1:n+1].mean()
+	for i in range(n+1, len(x)):
+		a[i] = (a[i-1] * (n - 1) + x[i]) / n
+	return a
+
+
+@njit(cache=True)
+def _psar_kernel(high:np.ndarray, low:np.ndarray, af0:float, afMax:float) -> tuple[np.ndarray, np.ndarray]:
+	"""Parabolic SAR recurrence on plain arrays
+
+	Args:
+		high (np.ndarray): High prices (float64).
+		low (np.ndarray): Low prices (float64).
+		af0 (float): Scaling factor.
+		afMax (float): Maximum factor.
+
+	Returns:
+		tuple[np.ndarray, np.ndarray]: PSAR values, Bullish flags
+	"""
+	n = len(high)
+	psar = np.full(n, np.nan)
+	ep = np.full(n, np.nan)
+	af = np.full(n, np.nan)
+	bull = np.ones(n, dtype=np.bool_)
+	if n == 0:
+		return psar, bull
+	psar[0] = low[0]
+	af[0] = af0
+	ep[0] = high[0]
+	for a in range(1, n):
+		if bull[a-1]:
+			psar[a] = psar[a-1] + (af[a-1]*(ep[a-1]-psar[a-1]))
+			bull[a] = True
+			if low[a] < psar[a-1] or low[a] < psar[a]:
+				bull[a] = False
+				psar[a] = ep[a-1]
+				ep[a] = low[a-1]
+				af[a] = af0
+			else:
+				if high[a] > ep[a-1]:
+					ep[a] = high[a]
+					if af[a-1] <= (afMax - af0):
+						af[a] = af[a-1] + af0
+					else:
+						af[a] = af[a-1]
+				elif high[a] <= ep[a-1]:
+					af[a] = af[a-1]
+					ep[a] = ep[a-1]
+		else:
+			psar[a] = psar[a-1] - (af[a-1]*(psar[a-1]-ep[a-1]))
+			bull[a] = False
+			if high[a] > psar[a-1] or high[a] > psar[a]:
+				bull[a] = True
+				psar[a] = ep[a-1]
+				ep[a] = high[a-1]
+				af[a] = af0
+			else:
+				if low[a] < ep[a-1]:
+					ep[a] = low[a]
+					if af[a-1] < afMax:
+						af[a] = af[a-1] + af0
+					else:
+						af[a] = af[a-1]
+				elif low[a] >= ep[a-1]:
+					af[a] = af[a-1]
+					ep[a] = ep[a-1]
+	return psar, bull
+
+
+def _warmupKernels():
+	"""Compile (or load from the numba cache) the kernels once per process
+
+	The arrays are created like in the indicators (read-only pandas views),
+	so the warmup matches the signature of the later calls.
+	"""
+	try:
+		x = pd.Series(np.zeros(3)).to_numpy(dtype=np.float64)
+		_rma_kernel(x, 1)
+		_psar_kernel(x, x, 0.02, 0.2)
+	except Exception as e:
+		logger.warning(f'Unable to warm up the indicator kernels: {e}')
+
+
+_warmupKernels()
+
+
+def SimpleMovingAverage(df:pd.DataFrame, period:int, source:str='adjusted_close') -> tuple[bool, pd.DataFrame, list[str]]:
 	"""Simple Moving Average (SMA) Indicator
 
 	Args:
@@ -41,7 +175,7 @@ def SimpleMovingAverage(df:pd.DataFrame, period:Decimal, source:str='adjusted_cl
 	try:
 		N = int(period)
 		if len(df) > N:
-			df['sma'] = df[source].rolling(N).mean()
+			df['sma'] = _moving(df[source].to_numpy(dtype=np.float64), N, 'mean')
 			df['rising'] = df['sma'].pct_change(fill_method=None) > 0.0
 		else:
 			for k in keys:
@@ -55,7 +189,7 @@ def SimpleMovingAverage(df:pd.DataFrame, period:Decimal, source:str='adjusted_cl
 	return False, df, keys
 
 
-def ExponentialMovingAverage(df:pd.DataFrame, period:Decimal, source:str='adjusted_close') -> tuple[bool, pd.DataFrame, list[str]]:
+def ExponentialMovingAverage(df:pd.DataFrame, period:int, source:str='adjusted_close') -> tuple[bool, pd.DataFrame, list[str]]:
 	"""Exponential Moving Average (EMA) Indicator
 
 	Args:
@@ -84,13 +218,13 @@ def ExponentialMovingAverage(df:pd.DataFrame, period:Decimal, source:str='adjust
 	return False, df, keys
 
 
-def BollingerBands(df:pd.DataFrame, period:Decimal=Decimal(20), std:Decimal=Decimal(2), source:str='adjusted_close') -> tuple[bool, pd.DataFrame, list[str]]:
+def BollingerBands(df:pd.DataFrame, period:int=20, std:float=2.0, source:str='adjusted_close') -> tuple[bool, pd.DataFrame, list[str]]:
 	"""Bollinger Bands (BB), Simple Moving Average (SMA) and Bollinger %B
 
 	Args:
 		df (pd.DataFrame): Pandas DataFrame with historical quotes.
-		period (Decimal): Period of N elements to use.
-		std (Decimal): Standard Deviations for Bollinger Bands
+		period (int): Period of N elements to use.
+		std (float): Standard Deviations for Bollinger Bands
 		source (str, optional): Source data to use (defaults to **adjusted_close**) 
 
 	Returns:
@@ -101,16 +235,20 @@ def BollingerBands(df:pd.DataFrame, period:Decimal=Decimal(20), std:Decimal=Deci
 		N = int(period)
 		stdev = float(std)
 		if len(df) > N:
-			df['std'] = df[source].rolling(N).std(ddof=0)
-			df['sma'] = df[source].rolling(N).mean()
-			df['bb_upper'] = df['sma'] + stdev * df['std']
-			df['bb_lower'] = df['sma'] - stdev * df['std']
-			# Expanding
-			df['bb_expanding'] = df['std'].pct_change(fill_method=None) > 0.0
-			# Calculate symmetric %B
-			df['bb_pc'] = (df[source].astype(float) - df['sma']) / df['std']
-			# Cleanup DataFrame
-			df = df.drop('std', axis=1)
+			src = df[source].to_numpy(dtype=np.float64)
+			deviation = _moving(src, N, 'std')
+			sma = _moving(src, N, 'mean')
+			# Flat windows (std=0) result in inf/NaN like pandas
+			with np.errstate(divide='ignore', invalid='ignore'):
+				df['sma'] = sma
+				df['bb_upper'] = sma + stdev * deviation
+				df['bb_lower'] = sma - stdev * deviation
+				# Expanding
+				expanding = np.zeros(len(deviation), dtype=bool)
+				expanding[1:] = (deviation[1:] / deviation[:-1] - 1.0) > 0.0
+				df['bb_expanding'] = expanding
+				# Calculate symmetric %B
+				df['bb_pc'] = (src - sma) / deviation
 		else:
 			for k in keys:
 				df[k] = None
@@ -123,12 +261,12 @@ def BollingerBands(df:pd.DataFrame, period:Decimal=Decimal(20), std:Decimal=Deci
 	return False, df, keys
 
 
-def RSI(df:pd.DataFrame, period:Decimal=Decimal(14), source:str='close') -> tuple[bool, pd.DataFrame, list[str]]:
+def RSI(df:pd.DataFrame, period:int=14, source:str='close') -> tuple[bool, pd.DataFrame, list[str]]:
 	"""Relative Strength Index (RSI)
 
 	Args:
 		df (pd.DataFrame): Pandas DataFrame with historical quotes.
-		period (Decimal, optional): RSI period. Defaults to Decimal(14).
+		period (int, optional): RSI period. Defaults to 14.
 		source (str, optional): Source for RSI calculation. Defaults to 'close'.
 
 	Returns:
@@ -141,25 +279,13 @@ def RSI(df:pd.DataFrame, period:Decimal=Decimal(14), source:str='close') -> tupl
 			df['gain'] = df.change.mask(df.change < 0, 0.0)
 			df['loss'] = -df.change.mask(df.change > 0, -0.0)
 
-			def rma(x, n):
-				a = np.full_like(x, np.nan)
-				a[n] = x[1:n+1].mean()
-				for i in range(n+1, len(x)):
-					a[i] = (a[i-1] * (n - 1) + x[i]) / n
-				return a
-
-			df['avg_gain'] = rma(df.gain.to_numpy(), N)
-			df['avg_loss'] = rma(df.loss.to_numpy(), N)
+			df['avg_gain'] = _rma_kernel(df.gain.to_numpy(dtype=np.float64), N)
+			df['avg_loss'] = _rma_kernel(df.loss.to_numpy(dtype=np.float64), N)
 
 			df['rs'] = df.avg_gain / df.avg_loss
 			df['rsi'] = 100 - (100 / (1 + df.rs))
 
-			del df['change']
-			del df['gain']
-			del df['loss']
-			del df['avg_gain']
-			del df['avg_loss']
-			del df['rs']
+			df = df.drop(['change', 'gain', 'loss', 'avg_gain', 'avg_loss', 'rs'], axis=1)
 		else:
 			df['rsi'] = None
 		return True, df, ['rsi']
@@ -171,19 +297,19 @@ def RSI(df:pd.DataFrame, period:Decimal=Decimal(14), source:str='close') -> tupl
 	return False, df, ['rsi']
 
 
-def ADXDMI(df:pd.DataFrame, period:Decimal=Decimal(14)) -> tuple[bool, pd.DataFrame, list[str]]:
+def ADXDMI(df:pd.DataFrame, period:int=14) -> tuple[bool, pd.DataFrame, list[str]]:
 	"""ADX/DMI Indicator
 
 	Args:
 		df (pd.DataFrame): Pandas DataFrame with historical quotes.
-		period (Decimal): Period of N elements to use (defaults to 14)
+		period (int): Period of N elements to use (defaults to 14)
 
 	Returns:
 		tuple[bool, pd.DataFrame]: True/False if success, Output DataFrame with columns **dmi_p**, **dmi_m**, **adx**, **adx_crossing_date** and **dmi_crossing_date** added, List of column names added to the DataFrame.
 	"""
 	keys = ['dmi_p', 'dmi_m', 'dmi_bull', 'adx', 'adx_crossing_date', 'dmi_crossing_date']
 	try:
-		alpha = float(1/period)
+		alpha = 1.0/period
 		# True Range
 		df['H-L'] = df['high'] - df['low']
 		df['H-C'] = np.abs(df['high'] - df['close'].shift(1))
@@ -220,38 +346,23 @@ def ADXDMI(df:pd.DataFrame, period:Decimal=Decimal(14)) -> tuple[bool, pd.DataFr
 		# Calculate last change date
 		df['adx_crossing_date'] = None
 		df['dmi_crossing_date'] = None
-		first = True
-		search = None
-		dmiFound = False
-		adxFound = False
-		valueBefore = None
-		for i, value in df.sort_index(ascending=False).iterrows():
-			if first == True:
-				search = value['dmi_bull']
-				first = False
-			else:
-				# Find last DMI crossing
-				if value['dmi_bull'] is not search and dmiFound == False:
-					df.loc[df.index[-1], 'dmi_crossing_date'] = valueBefore['date']
-					dmiFound = True
-					# Stop to search for ADX crossing after DMI crossed
-					if adxFound == False:
-						break
-				if adxFound == False:
-					# Find ADX crossing
-					if value['dmi_bull'] == True:
-						# Bullish Golden Crossing
-						if value['adx'] <= value['dmi_m'] and valueBefore['adx'] > valueBefore['dmi_m']:
-							df.loc[df.index[-1], 'adx_crossing_date'] = valueBefore['date']
-							adxFound = True
-					else:
-						# Bearish Golden Crossing
-						if value['adx'] <= value['dmi_p'] and valueBefore['adx'] > valueBefore['dmi_p']:
-							df.loc[df.index[-1], 'adx_crossing_date'] = valueBefore['date']
-							adxFound = True
-			if adxFound and dmiFound:
-				break
-			valueBefore = value
+		n = len(df)
+		if n > 1:
+			bull = df['dmi_bull'].to_numpy()
+			dates = df['date']
+			# Find last DMI crossing
+			flips = np.flatnonzero(bull[:-1] != bull[-1])
+			start = 0
+			if len(flips) > 0:
+				start = flips[-1] + 1
+				df.loc[df.index[-1], 'dmi_crossing_date'] = dates.iloc[start]
+			# Find last ADX crossing since the DMI crossing (Bullish/Bearish Golden Crossing)
+			adx = df['adx'].to_numpy(dtype=np.float64)
+			ref = (df['dmi_m'] if bull[-1] == True else df['dmi_p']).to_numpy(dtype=np.float64)
+			crossing = (adx[start:n-1] <= ref[start:n-1]) & (adx[start+1:] > ref[start+1:])
+			hits = np.flatnonzero(crossing)
+			if len(hits) > 0:
+				df.loc[df.index[-1], 'adx_crossing_date'] = dates.iloc[start + hits[-1] + 1]
 		return True, df, keys
 	except Exception as e:
 		logger.error(f'Error while calculating indicator "ADXDMI"')
@@ -261,78 +372,33 @@ def ADXDMI(df:pd.DataFrame, period:Decimal=Decimal(14)) -> tuple[bool, pd.DataFr
 	return False, df, keys
 
 
-def PSAR(df:pd.DataFrame, af:Decimal=Decimal('0.02'), max:Decimal=Decimal('0.2')) -> tuple[bool, pd.DataFrame, list[str]]:
+def PSAR(df:pd.DataFrame, af:float=0.02, max:float=0.2) -> tuple[bool, pd.DataFrame, list[str]]:
 	"""Parabolic Stop And Return Indicator
 
 	Args:
 		df (pd.DataFrame): Pandas DataFrame with historical quotes.
-		af (Decimal, optional): Scaling factor. (Defaults to 0.02)
-		max (Decimal, optional): Maximum factor. (Defaults to 0.2)
+		af (float, optional): Scaling factor. (Defaults to 0.02)
+		max (float, optional): Maximum factor. (Defaults to 0.2)
 
 	Returns:
 		tuple[bool, pd.DataFrame]: True/False if success, Output DataFrame with columns **psar**, **psar_bull** and **psar_change_date** added, List of column names added to the DataFrame.
 	"""
 	keys = ['psar', 'psar_bull', 'psar_change_date']
 	try:
-		df.loc[0, 'psar'] = df.loc[0, 'low']
-		df['psar_bull'] = True
-		df.loc[0, 'AF'] = float(af)
-		df.loc[0, 'EP'] = df.loc[0, 'high']
-		for a in range(1, len(df)):
-			if df.loc[a-1, 'psar_bull'] == True:
-				df.loc[a, 'psar'] = df.loc[a-1, 'psar'] + (df.loc[a-1, 'AF']*(df.loc[a-1, 'EP']-df.loc[a-1, 'psar']))
-				df.loc[a, 'psar_bull'] = True
-				if df.loc[a, 'low'] < df.loc[a-1, 'psar'] or df.loc[a, 'low'] < df.loc[a, 'psar']:
-					df.loc[a, 'psar_bull'] = False
-					df.loc[a, 'psar'] = df.loc[a-1, 'EP']
-					df.loc[a, 'EP'] = df.loc[a-1, 'low']
-					df.loc[a, 'AF'] = float(af)
-				else:
-					if df.loc[a, 'high'] > df.loc[a-1, 'EP']:
-						df.loc[a, 'EP'] = df.loc[a, 'high']
-						if df.loc[a-1, 'AF'] <= (float(max) - float(af)):
-							df.loc[a, 'AF'] = df.loc[a-1, 'AF'] + float(af)
-						else:
-							df.loc[a, 'AF'] = df.loc[a-1, 'AF']
-					elif df.loc[a, 'high'] <= df.loc[a-1, 'EP']:
-						df.loc[a, 'AF'] = df.loc[a-1, 'AF']
-						df.loc[a, 'EP'] = df.loc[a-1, 'EP']
-			elif df.loc[a-1, 'psar_bull'] == False:
-				df.loc[a, 'psar'] = df.loc[a-1, 'psar'] - (df.loc[a-1, 'AF']*(df.loc[a-1, 'psar']-df.loc[a-1, 'EP']))
-				df.loc[a, 'psar_bull'] = False
-				if df.loc[a, 'high'] > df.loc[a-1, 'psar'] or df.loc[a, 'high'] > df.loc[a, 'psar']:
-					df.loc[a, 'psar_bull'] = True
-					df.loc[a, 'psar'] = df.loc[a-1, 'EP']
-					df.loc[a, 'EP'] = df.loc[a-1, 'high']
-					df.loc[a, 'AF'] = float(af)
-				else:
-					if df.loc[a, 'low'] < df.loc[a-1, 'EP']:
-						df.loc[a, 'EP'] = df.loc[a, 'low']
-						if df.loc[a-1, 'AF'] < float(max):
-							df.loc[a, 'AF'] = df.loc[a-1, 'AF'] + float(af)
-						else:
-							df.loc[a, 'AF'] = df.loc[a-1, 'AF']
-					elif df.loc[a, 'low'] >= df.loc[a-1, 'EP']:
-						df.loc[a, 'AF'] = df.loc[a-1, 'AF']
-						df.loc[a, 'EP'] = df.loc[a-1, 'EP']
-		# Remove temporary columns
-		df = df.drop(['AF','EP'], axis=1)
+		psar, bull = _psar_kernel(
+			df['high'].to_numpy(dtype=np.float64),
+			df['low'].to_numpy(dtype=np.float64),
+			float(af),
+			float(max)
+		)
+		df['psar'] = psar
+		df['psar_bull'] = bull
 
 		# Calculate last change date
 		df['psar_change_date'] = None
-		first = True
-		search = None
-		valueBefore = None
-		for i, value in df.sort_index(ascending=False).iterrows():
-			if first == True:
-				search = value['psar_bull']
-				first = False
-			else:
-				if value['psar_bull'] is not search:
-					df.loc[df.index[-1], 'psar_change_date'] = valueBefore['date']
-					#df['psar_change_date'] = valueBefore['date']
-					break
-			valueBefore = value
+		flips = np.flatnonzero(bull[1:] != bull[:-1])
+		if len(flips) > 0:
+			df.loc[df.index[-1], 'psar_change_date'] = df['date'].iloc[flips[-1]+1]
 
 		return True, df, keys
 	except Exception as e:
@@ -343,6 +409,33 @@ def PSAR(df:pd.DataFrame, af:Decimal=Decimal('0.02'), max:Decimal=Decimal('0.2')
 	return False, df, keys
 
 
+def slopeValues(df:pd.DataFrame, source:str) -> pd.Series:
+	"""Values of the Slope indicator without the DataFrame handling
+
+	Args:
+		df (pd.DataFrame): Pandas DataFrame with historical quotes.
+		source (str): Source data to use for slope calculation.
+
+	Returns:
+		pd.Series: True if the value increased
+	"""
+	return df[source].diff() > 0
+
+
+def largerValues(df:pd.DataFrame, source1:str, source2:str) -> pd.Series:
+	"""Values of the Larger indicator without the DataFrame handling
+
+	Args:
+		df (pd.DataFrame): Pandas DataFrame with historical quotes.
+		source1 (str): Source1 data to compare.
+		source2 (str): Source2 data to compare.
+
+	Returns:
+		pd.Series: True if source1 > source2
+	"""
+	return df[source1] > df[source2]
+
+
 def Slope(df:pd.DataFrame, source:str) -> tuple[bool, pd.DataFrame, list[str]]:
 	"""Slope indicator
 
@@ -354,7 +447,7 @@ def Slope(df:pd.DataFrame, source:str) -> tuple[bool, pd.DataFrame, list[str]]:
 		tuple[bool, pd.DataFrame]: True/False if success, Output DataFrame with columns **slope**, List of column names added to the DataFrame.
 	"""
 	try:
-		df['slope'] = df[source].diff() > 0
+		df['slope'] = slopeValues(df, source)
 		return True, df, ['slope']
 	except Exception as e:
 		logger.error(f'Error while calculating indicator "Slope"')
@@ -375,7 +468,7 @@ def Larger(df:pd.DataFrame, source1:str, source2:str) -> tuple[bool, pd.DataFram
 		tuple[bool, pd.DataFrame]: True/False if success, Output DataFrame with columns **larger**, List of column names added to the DataFrame.
 	"""
 	try:
-		df['larger'] = df[source1] > df[source2]
+		df['larger'] = largerValues(df, source1, source2)
 		return True, df, ['larger']
 	except Exception as e:
 		logger.error(f'Error while calculating indicator "Larger"')
@@ -399,9 +492,10 @@ def HighLow(df:pd.DataFrame, interval:int, sourceHigh:str='high', sourceLow:str=
 	"""
 	keys = ['window_high', 'window_high_pc', 'window_low', 'window_low_pc']
 	try:
-		df['window_high'] = df[sourceHigh].rolling(window=interval).max()
+		N = int(interval)
+		df['window_high'] = _moving(df[sourceHigh].to_numpy(dtype=np.float64), N, 'max')
 		df['window_high_pc'] = (df[sourcePercentage]/df['window_high'] - 1.0) * 100.0
-		df['window_low'] = df[sourceLow].rolling(window=interval).min()
+		df['window_low'] = _moving(df[sourceLow].to_numpy(dtype=np.float64), N, 'min')
 		df['window_low_pc'] = (df[sourcePercentage]/df['window_low'] - 1.0) * 100.0
 		return True, df, keys
 	except Exception as e:
@@ -33,4 +33,18 @@ ALTER TABLE indicators ADD COLUMN IF NOT EXISTS psar_bull_m BOOLEAN;
 ALTER TABLE indicators ADD COLUMN IF NOT EXISTS psar_change_date_m DATE;
 
 ALTER TABLE indicators ADD COLUMN IF NOT EXISTS volume_sma INTEGER;
-ALTER TABLE indicators ADD COLUMN IF NOT EXISTS volume_sma_slope BOOLEAN;
\ No newline at end of file
+ALTER TABLE indicators ADD COLUMN IF NOT EXISTS volume_sma_slope BOOLEAN;
+
+-- Exchange is its own virtual exchange (Query.exchanges)
+ALTER TABLE exchanges ADD COLUMN IF NOT EXISTS virtual BOOLEAN GENERATED ALWAYS AS (CASE WHEN virtual_exchange IS NULL THEN FALSE ELSE (code=virtual_exchange) END) STORED;
+
+-- Latest listing of a security (getSecurityAndExchange)
+CREATE INDEX IF NOT EXISTS securities_code_last_update_idx ON securities (code, last_update DESC) INCLUDE (id, exchange);
+
+-- Matching indicator rows of the adx-bull/adx-bear screeners
+CREATE INDEX IF NOT EXISTS indicators_adx_bull_idx ON indicators (security, date DESC) WHERE dmi_bull_d IS TRUE AND adx_slope_d IS TRUE AND psar_bull_d IS TRUE AND dmi_bull_w IS TRUE AND adx_slope_w IS TRUE AND psar_bull_w IS TRUE AND dmi_bull_m IS TRUE AND adx_slope_m IS TRUE AND psar_bull_m IS TRUE;
+CREATE INDEX IF NOT EXISTS indicators_adx_bear_idx ON indicators (security, date DESC) WHERE dmi_bull_d IS FALSE AND adx_slope_d IS TRUE AND psar_bull_d IS FALSE AND dmi_bull_w IS FALSE AND adx_slope_w IS TRUE AND psar_bull_w IS FALSE AND dmi_bull_m IS FALSE AND adx_slope_m IS TRUE AND psar_bull_m IS FALSE;
+
+-- Substring search of searchSecurity (code ILIKE '%text%')
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS securities_code_trgm_idx ON securities USING gin (code gin_trgm_ops) WHERE is_delisted = FALSE;
@@ -0,0 +1,206 @@
+"""
+ @copyright Copyright (C) 2024 Dennis Greguhn <dev@greguhn.de>
+ 
+ @author Dennis Greguhn <dev@greguhn.de>
+ 
+ @license AGPL-3.0-or-later
+ 
+ This program is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as
+ published by the Free Software Foundation, either version 3 of the
+ License, or (at your option) any later version.
+ 
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+ 
+ You should have received a copy of the GNU Affero General Public License
+ along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from itertools import groupby
+from operator import itemgetter
+
+from asyncpg import Record
+from aiodataloader import DataLoader
+
+from database import RequestConnection
+
+
+class RowLoader(DataLoader):
+	"""DataLoader for table rows by their primary key (id)
+
+	All keys loaded in the same event loop tick are fetched with a single
+	query (id = ANY($1)), the results are cached for the current request.
+	"""
+
+	def __init__(self, dbConn:RequestConnection, table:str):
+		"""Init method
+
+		Args:
+			dbConn (RequestConnection): Database connection of the current request.
+			table (str): Table to load the rows from.
+		"""
+		super().__init__()
+		self.dbConn = dbConn
+		self.sql = f'SELECT * FROM {table} WHERE id = ANY($1);'
+
+
+	async def batch_load_fn(self, keys:list[int]) -> list[Record]:
+		"""Load all rows for the given primary keys
+
+		Args:
+			keys (list[int]): Primary keys (IDs).
+
+		Returns:
+			list[Record]: Rows in the order of the keys, None if not found.
+		"""
+		async with self.dbConn.acquire() as con:
+			rows = await con.fetch(self.sql, list(keys))
+		byId = {row['id']: row for row in rows}
+		return [byId.get(key) for key in keys]
+
+
+class SecurityListLoader(DataLoader):
+	"""DataLoader for all child rows of securities (e.g. splits or dividends)
+
+	The query must select the security column first, filter by
+	security = ANY($1) and be ordered by security.
+	"""
+
+	def __init__(self, dbConn:RequestConnection, sql:str):
+		"""Init method
+
+		Args:
+			dbConn (RequestConnection): Database connection of the current request.
+			sql (str): Batch query, see class description.
+		"""
+		super().__init__()
+		self.dbConn = dbConn
+		self.sql = sql
+
+
+	async def fetchGrouped(self, ids:list[int], *args) -> dict:
+		"""Run the batch query and group the rows by security
+
+		Args:
+			ids (list[int]): Security IDs.
+			*args: Additional query parameters.
+
+		Returns:
+			dict: Security ID -> list of rows
+		"""
+		async with self.dbConn.acquire() as con:
+			rows = await con.fetch(self.sql, ids, *args)
+		return {security: list(group) for security, group in groupby(rows, key=itemgetter('security'))}
+
+
+	async def batch_load_fn(self, keys:list[int]) -> list[list[Record]]:
+		"""Load the child rows for the given securities
+
+		Args:
+			keys (list[int]): Security IDs.
+
+		Returns:
+			list[list[Record]]: Rows per security in the order of the keys.
+		"""
+		grouped = await self.fetchGrouped(list(keys))
+		return [grouped.get(key, []) for key in keys]
+
+
+class SecurityRangeLoader(SecurityListLoader):
+	"""DataLoader for child rows of securities within a date range
+
+	Keys are (security, start, end, limit) tuples, so different ranges are
+	cached separately. The query gets the start date, end date and the row
+	limit per security (NULL for all rows) as $2, $3 and $4.
+	"""
+
+	async def batch_load_fn(self, keys:list[tuple]) -> list[list[Record]]:
+		"""Load the child rows for the given securities and date ranges
+
+		Args:
+			keys (list[tuple]): (security ID, start date, end date, limit) tuples.
+
+		Returns:
+			list[list[Record]]: Rows per key in the order of the keys.
+		"""
+		# One query per distinct date range and limit
+		ranges = {}
+		for id, start, end, limit in keys:
+			ranges.setdefault((start, end, limit), []).append(id)
+		results = {}
+		for (start, end, limit), ids in ranges.items():
+			grouped = await self.fetchGrouped(ids, start, end, limit)
+			for id in ids:
+				results[(id, start, end, limit)] = grouped.get(id, [])
+		return [results[key] for key in keys]
+
+
+class SecurityRowLoader(DataLoader):
+	"""DataLoader for a single child row per security (e.g. the last quote)
+
+	The query must filter by security = ANY($1) and return at most one row per
+	security, e.g. with DISTINCT ON (security).
+	"""
+
+	def __init__(self, dbConn:RequestConnection, sql:str, dropSecurity:bool=False):
+		"""Init method
+
+		Args:
+			dbConn (RequestConnection): Database connection of the current request.
+			sql (str): Batch query, see class description.
+			dropSecurity (bool, optional): Remove the security column (foreign key) from the rows. Defaults to False.
+		"""
+		super().__init__()
+		self.dbConn = dbConn
+		self.sql = sql
+		self.dropSecurity = dropSecurity
+
+
+	async def batch_load_fn(self, keys:list[int]) -> list[Record | dict]:
+		"""Load the row for the given securities
+
+		Args:
+			keys (list[int]): Security IDs.
+
+		Returns:
+			list[Record | dict]: Rows in the order of the keys, None if not found.
+		"""
+		async with self.dbConn.acquire() as con:
+			rows = await con.fetch(self.sql, list(keys))
+		bySecurity = {}
+		for row in rows:
+			if self.dropSecurity:
+				e = dict(row)
+				del e['security']
+				bySecurity[row['security']] = e
+			else:
+				bySecurity[row['security']] = row
+		return [bySecurity.get(key) for key in keys]
+
+
+class Loaders():
+	"""All DataLoader instances of a single request"""
+
+	def __init__(self, dbConn:RequestConnection):
+		"""Init method
+
+		Args:
+			dbConn (RequestConnection): Database connection of the current request.
+		"""
+		self.currency = RowLoader(dbConn, 'currencies')
+		self.country = RowLoader(dbConn, 'countries')
+		self.exchange = RowLoader(dbConn, 'exchanges')
+
+		# Security child rows
+		# Limit per security, the rows are grouped in the order of the IDs
+		self.quotes = SecurityRangeLoader(dbConn, 'SELECT q.* FROM unnest($1::int[]) AS ids(id) CROSS JOIN LATERAL (SELECT security, date, open, high, low, close, split_adjusted_open, split_adjusted_high, split_adjusted_low, split_adjusted_close, adjusted_close, volume FROM quotes WHERE security = ids.id AND date >= $2 AND date <= $3 ORDER BY date ASC LIMIT $4) q;')
+		self.outstandingShares = SecurityRangeLoader(dbConn, 'SELECT o.* FROM unnest($1::int[]) AS ids(id) CROSS JOIN LATERAL (SELECT security, date, outstanding_shares FROM outstanding_shares WHERE security = ids.id AND date >= $2 AND date <= $3 ORDER BY date ASC LIMIT $4) o;')
+		self.splits = SecurityListLoader(dbConn, 'SELECT security, date, old, new FROM splits WHERE security = ANY($1) ORDER BY security, date ASC;')
+		self.dividends = SecurityListLoader(dbConn, 'SELECT security, date, declaration_date, record_date, payment_date, period, adjusted_value, value FROM dividends WHERE security = ANY($1) ORDER BY security, date ASC;')
+		self.analystRatings = SecurityListLoader(dbConn, 'SELECT security, date_added, rating, target_price, strong_buy, buy, hold, sell, strong_sell FROM analyst_ratings WHERE security = ANY($1) ORDER BY security, date_added ASC;')
+		self.lastQuote = SecurityRowLoader(dbConn, 'SELECT DISTINCT ON (security) * FROM quotes WHERE security = ANY($1) ORDER BY security, date DESC;')
+		self.indicators = SecurityRowLoader(dbConn, 'SELECT DISTINCT ON (security) * FROM indicators WHERE security = ANY($1) ORDER BY security, date DESC;', dropSecurity=True)
+		self.etfData = SecurityRowLoader(dbConn, 'SELECT DISTINCT ON (security) security, company_name, company_url, etf_url, yield, dividend_paying_frequency, inception_date, total_assets, holdings_count FROM etf_data WHERE security = ANY($1);')
@@ -19,18 +19,15 @@
  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import os
 import uvicorn
 import logging
 import multiprocessing
 
-# For .env file
-from dotenv import load_dotenv
-load_dotenv()
+# Settings from .env file
+from settings import settings
 
 from application import createApp
 
-from utils import parseBoolean
 from log_config import getNewLogger, UVICON_CONFIG
 
 
@@ -44,11 +41,15 @@ if __name__ == '__main__':
 			'main:createApp',
 			factory=True,
 			log_config=UVICON_CONFIG,
-			log_level=logging._nameToLevel[os.environ.get('backend_log_level').upper()],
-			access_log=parseBoolean(os.environ.get('debug')),
-			host=os.environ.get('host'),
-			port=int(os.environ.get('port')),
-			workers=int(os.environ.get('workers'))
+			log_level=logging._nameToLevel[settings.backend_log_level.upper()],
+			access_log=settings.debug,
+			host=settings.host,
+			port=settings.port,
+			workers=settings.workers,
+			loop='uvloop',
+			http='httptools',
+			timeout_keep_alive=settings.timeout_keep_alive,
+			limit_concurrency=settings.limit_concurrency
 		)
 	except Exception as e:
 		logger.error('main error')
@@ -0,0 +1,175 @@
+"""
+ @copyright Copyright (C) 2024 Dennis Greguhn <dev@greguhn.de>
+ 
+ @author Dennis Greguhn <dev@greguhn.de>
+ 
+ @license AGPL-3.0-or-later
+ 
+ This program is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as
+ published by the Free Software Foundation, either version 3 of the
+ License, or (at your option) any later version.
+ 
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+ 
+ You should have received a copy of the GNU Affero General Public License
+ along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hmac
+from typing import Callable
+
+import orjson
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from log_config import getNewLogger
+from database import DatabaseConnector, RequestConnection
+
+
+# Prebuilt error responses
+_ERR_500 = orjson.dumps({'status': 500, 'message': 'server error'})
+_ERR_401 = orjson.dumps({'status': 401, 'message': 'not authenticated'})
+
+
+class AuthASGIMiddleware:
+	"""Pure ASGI middleware to block unauthorized GraphQL mutations"""
+
+	def __init__(self, app:ASGIApp, token_getter:Callable[[], bytes]):
+		"""Init method
+
+		Args:
+			app (ASGIApp): Wrapped ASGI application.
+			token_getter (Callable[[], bytes]): Function returning the encoded valid auth token.
+		"""
+		self.app = app
+		self.token_getter = token_getter
+		self.logger = getNewLogger('auth')
+
+
+	async def __call__(self, scope:Scope, receive:Receive, send:Send):
+		# Only POST requests can contain mutations
+		if scope['type'] != 'http' or scope['method'] != 'POST':
+			await self.app(scope, receive, send)
+			return
+
+		# Buffer the whole request body...
+		messages = []
+		body = b''
+		while True:
+			message = await receive()
+			messages.append(message)
+			if message['type'] != 'http.request':
+				break
+			body += message.get('body', b'')
+			if not message.get('more_body', False):
+				break
+
+		# ...and check for mutations
+		try:
+			mutation = self.isMutation(body)
+		except Exception as e:
+			self.logger.warning(f'Invalid GraphQL request body: {e}')
+			await self.sendJson(send, 500, _ERR_500)
+			return
+
+		if mutation:
+			# We need some authorization to do modifications
+			token = b''
+			for key, value in scope['headers']:
+				if key == b'x-auth-token':
+					token = value
+					break
+			if not hmac.compare_digest(token, self.token_getter()):
+				self.logger.warning(f'Unauthorized mutation {body[:256]}')
+				await self.sendJson(send, 401, _ERR_401)
+				return
+
+		# Replay the buffered body for the wrapped application
+		async def receiveWrapper() -> Message:
+			if len(messages) > 0:
+				return messages.pop(0)
+			return await receive()
+
+		try:
+			await self.app(scope, receiveWrapper, send)
+		except Exception:
+			# Let the Starlette error middleware create the response
+			self.logger.exception('Unhandled exception while processing request')
+			raise
+
+
+	@staticmethod
+	def isMutation(body:bytes) -> bool:
+		"""Check if a GraphQL POST body contains a mutation
+
+		Only bodies that can possibly contain a mutation are fully parsed, the
+		keyword may also appear in variables or strings, so only the top-level
+		query decides.
+
+		Args:
+			body (bytes): Raw JSON request body.
+
+		Returns:
+			bool: True if the query is a mutation.
+		"""
+		# Fast path: without the keyword (or unicode escapes) there is no mutation
+		if b'mutation' not in body and b'\\u' not in body:
+			return False
+		jobj = orjson.loads(body)
+		# jobj['operationName'] -> user defined operation name, NOT GraphQL query/mutation
+		return jobj['query'].lstrip().startswith('mutation')
+
+
+	@staticmethod
+	async def sendJson(send:Send, status:int, body:bytes):
+		"""Send a complete JSON response through the ASGI channel
+
+		Args:
+			send (Send): ASGI send function.
+			status (int): HTTP status code.
+			body (bytes): Serialized JSON content of the response.
+		"""
+		await send({
+			'type': 'http.response.start',
+			'status': status,
+			'headers': [
+				(b'content-type', b'application/json'),
+				(b'content-length', str(len(body)).encode('latin-1')),
+			],
+		})
+		await send({'type': 'http.response.body', 'body': body})
+
+
+class DatabaseConnectionMiddleware:
+	"""Pure ASGI middleware to share one database connection per request
+
+	The RequestConnection is stored in the request state (request.state.dbConn)
+	and only acquires a pool connection on first use.
+	"""
+
+	def __init__(self, app:ASGIApp, connector_getter:Callable[[], DatabaseConnector]):
+		"""Init method
+
+		Args:
+			app (ASGIApp): Wrapped ASGI application.
+			connector_getter (Callable[[], DatabaseConnector]): Function returning the database connector.
+		"""
+		self.app = app
+		self.connector_getter = connector_getter
+
+
+	async def __call__(self, scope:Scope, receive:Receive, send:Send):
+		if scope['type'] != 'http':
+			await self.app(scope, receive, send)
+			return
+
+		dbConn = RequestConnection(self.connector_getter().dbPool)
+		scope.setdefault('state', {})['dbConn'] = dbConn
+		try:
+			await self.app(scope, receive, send)
+		finally:
+			await dbConn.release()
@@ -0,0 +1,127 @@
+"""
+ @copyright Copyright (C) 2024 Dennis Greguhn <dev@greguhn.de>
+ 
+ @author Dennis Greguhn <dev@greguhn.de>
+ 
+ @license AGPL-3.0-or-later
+ 
+ This program is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as
+ published by the Free Software Foundation, either version 3 of the
+ License, or (at your option) any later version.
+ 
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+ 
+ You should have received a copy of the GNU Affero General Public License
+ along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+
+from asyncpg import Record
+
+# Settings from .env file
+from settings import settings
+
+from log_config import getNewLogger
+from database import DatabaseConnector
+
+
+# Cached reference tables: table -> snapshot query
+CACHED_TABLES = {
+	'currencies': 'SELECT * FROM currencies;',
+	'countries': 'SELECT * FROM countries;',
+	'gics_codes': 'SELECT * FROM gics_codes ORDER BY id ASC;',
+}
+
+
+class ReferenceCache():
+	"""In-process snapshot of the small, almost static reference tables
+
+	The snapshot is loaded at startup and refreshed periodically in the
+	background. Lookups of unknown IDs return None, callers fall back to the
+	database in that case.
+	"""
+
+	def __init__(self, dbCon:DatabaseConnector):
+		"""Init method
+
+		Args:
+			dbCon (DatabaseConnector): Database connector with an open pool.
+		"""
+		self.dbCon = dbCon
+		self.logger = getNewLogger('reference_cache')
+		self.rows:dict[str, list[Record]] = {table: [] for table in CACHED_TABLES}
+		self.byId:dict[str, dict[int, Record]] = {table: {} for table in CACHED_TABLES}
+		self.refreshTask:asyncio.Task = None
+
+
+	async def refresh(self):
+		"""Reload all cached tables"""
+		async with self.dbCon.dbPool.acquire() as con:
+			for table, sql in CACHED_TABLES.items():
+				rows = await con.fetch(sql)
+				# Swap the complete snapshot at once
+				self.rows[table] = rows
+				self.byId[table] = {row['id']: row for row in rows}
+
+
+	async def refreshLoop(self):
+		"""Refresh the snapshot every reference_cache_refresh seconds"""
+		while True:
+			await asyncio.sleep(settings.reference_cache_refresh)
+			try:
+				await self.refresh()
+			except asyncio.CancelledError:
+				raise
+			except Exception as e:
+				self.logger.error(f'Failed to refresh the reference cache: {e}')
+
+
+	async def start(self):
+		"""Load the snapshot and start the background refresh"""
+		try:
+			await self.refresh()
+		except Exception as e:
+			self.logger.error(f'Failed to load the reference cache: {e}')
+		if settings.reference_cache_refresh > 0:
+			self.refreshTask = asyncio.create_task(self.refreshLoop())
+
+
+	async def stop(self):
+		"""Stop the background refresh"""
+		if self.refreshTask != None:
+			self.refreshTask.cancel()
+			try:
+				await self.refreshTask
+			except asyncio.CancelledError:
+				pass
+			self.refreshTask = None
+
+
+	def getAll(self, table:str) -> list[Record]:
+		"""All rows of a cached table
+
+		Args:
+			table (str): Table name
+
+		Returns:
+			list[Record]: Rows, empty if not loaded
+		"""
+		return self.rows[table]
+
+
+	def get(self, table:str, id:int) -> Record:
+		"""Row of a cached table by its ID
+
+		Args:
+			table (str): Table name
+			id (int): Primary key
+
+		Returns:
+			Record: Row or None if unknown
+		"""
+		return self.byId[table].get(id)
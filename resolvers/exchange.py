@@ -26,7 +26,7 @@ from graphql.type import GraphQLResolveInfo
 from ariadne import load_schema_from_path
 from ariadne_graphql_modules import ObjectType, DeferredType
 
-from context import getDbConnectorFromContext
+from context import getDbConnFromContext, getLoadersFromContext, getReferenceCacheFromContext
 
 
 class Exchange(ObjectType):
@@ -42,10 +42,12 @@ class Exchange(ObjectType):
 	@staticmethod
 	async def resolve_currency(obj, info:GraphQLResolveInfo):
 		try:
-			dbCon = getDbConnectorFromContext(info)
-			async with dbCon.dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM currencies WHERE id=$1;', obj['currency'])
-				return dict(data[0]) if len(data) == 1 else None
+			if obj['currency'] == None:
+				return None
+			data = getReferenceCacheFromContext(info).get('currencies', obj['currency'])
+			if data != None:
+				return data
+			return await getLoadersFromContext(info).currency.load(obj['currency'])
 		except Exception as e:
 			logger.error('Error at @exchange.field(currency)')
 			logger.error(e)
@@ -55,10 +57,12 @@ class Exchange(ObjectType):
 	@staticmethod
 	async def resolve_country(obj, info:GraphQLResolveInfo):
 		try:
-			dbCon = getDbConnectorFromContext(info)
-			async with dbCon.dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM countries WHERE id=$1;', obj['country'])
-				return dict(data[0]) if len(data) == 1 else None
+			if obj['country'] == None:
+				return None
+			data = getReferenceCacheFromContext(info).get('countries', obj['country'])
+			if data != None:
+				return data
+			return await getLoadersFromContext(info).country.load(obj['country'])
 		except Exception as e:
 			logger.error('Error at @exchange.field(country)')
 			logger.error(e)
@@ -68,10 +72,10 @@ class Exchange(ObjectType):
 	@staticmethod
 	async def resolve_holidays(obj, info:GraphQLResolveInfo):
 		try:
-			dbCon = getDbConnectorFromContext(info)
-			async with dbCon.dbPool.acquire() as con:
+			dbConn = getDbConnFromContext(info)
+			async with dbConn.acquire() as con:
 				data = await con.fetch('SELECT * FROM exchange_holidays WHERE exchange=$1;', obj['id'])
-				return [dict(e) for e in data] if len(data) > 0 else []
+				return data
 		except Exception as e:
 			logger.error('Error at @exchange.field(holidays)')
 			logger.error(e)
@@ -19,9 +19,6 @@
  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-import os
-from multiprocessing import Pool
-from indicator_factory import IndicatorFactory
 from log_config import logger
 
 from graphql.type import GraphQLResolveInfo
@@ -29,10 +26,12 @@ from graphql.type import GraphQLResolveInfo
 from ariadne import load_schema_from_path
 from ariadne_graphql_modules import ObjectType, DeferredType
 
-from utils import securityInputFilter, parseBoolean
-from context import getDbConnectorFromContext, getIndicatorFactoryFromContext, getTaskHandlerFromContext
+from utils import securityInputFilter
+from settings import settings
+from context import getDbConnectorFromContext, getDbConnFromContext, getTaskHandlerFromContext
 
 from tasks import BackgroundJobData
+from database import SecurityExchangeResult
 
 
 class Mutation(ObjectType):
@@ -47,6 +46,53 @@ class Mutation(ObjectType):
 		DeferredType('UpdateResult')
 	]
 
+	@staticmethod
+	async def getSecurity(info:GraphQLResolveInfo, data:dict) -> SecurityExchangeResult:
+		"""getSecurityAndExchange() with a request scoped cache of found securities
+
+		Args:
+			info (GraphQLResolveInfo): Input resolve info
+			data (dict): Filtered mutation input with code and exchange_code
+
+		Returns:
+			SecurityExchangeResult: Dataclass with results
+		"""
+		cache = info.context.setdefault('securities', {})
+		key = (data['code'], data['exchange_code'])
+		selector = cache.get(key)
+		if selector == None:
+			dbCon = getDbConnectorFromContext(info)
+			selector = await dbCon.getSecurityAndExchange(data['code'], data['exchange_code'], con=getDbConnFromContext(info))
+			if selector.id != None:
+				cache[key] = selector
+		logger.debug(selector)
+		return selector
+
+
+	@staticmethod
+	async def updateSecurityEntries(info:GraphQLResolveInfo, data:dict, table:str, constraint:str) -> tuple[int, dict]:
+		"""Shared implementation of the security child table mutations
+
+		Args:
+			info (GraphQLResolveInfo): Input resolve info
+			data (dict): Mutation input, the entries are stored under the table name
+			table (str): Child table, e.g. 'splits'
+			constraint (str): Unique constraint of the table
+
+		Returns:
+			tuple[int, dict]: Security ID (None if not found) and the UpdateResult
+		"""
+		data = securityInputFilter(data)
+		selector = await Mutation.getSecurity(info, data)
+		if selector.id == None:
+			return None, {'success':False, 'error':f'No security {data["code"]}:{data["exchange_code"]} found'}
+
+		dbCon = getDbConnectorFromContext(info)
+		result = await dbCon.forceUpdateEntries(table, {'security':selector.id}, data[table], constraint, con=getDbConnFromContext(info))
+		logger.debug(result)
+		return selector.id, {'success':result.success, 'error':result.exception}
+
+
 	@staticmethod
 	async def resolve_updateSecurity(_, info:GraphQLResolveInfo, data):
 		# GraphQLResolveInfo(field_name='updateSecurity', field_nodes=[FieldNode at 13:195], return_type=<GraphQLNonNull <GraphQLObjectType 'UpdateResult'>>, parent_type=<GraphQLObjectType 'Mutation'>, path=Path(prev=None, key='updateSecurity', typename='Mutation'), schema=<graphql.type.schema.GraphQLSchema object at 0x7fd0b65b89a0>, fragments={}, root_value=None, operation=OperationDefinitionNode at 0:197, variable_values={}, context={'request': <starlette.requests.Request object at 0x7fd0b4225910>}, is_awaitable=<function is_awaitable at 0x7fd0b723e430>)
@@ -54,16 +100,18 @@ class Mutation(ObjectType):
 		try:
 			data = securityInputFilter(data)
 			dbCon = getDbConnectorFromContext(info)
+			dbConn = getDbConnFromContext(info)
 
 			# Query existing fields
-			selector = await dbCon.getSecurityAndExchange(data['code'], data['exchange_code'])
-			logger.debug(selector)
+			selector = await Mutation.getSecurity(info, data)
+			# The security may be added or moved, look it up again next time
+			info.context['securities'].clear()
 
 			# Check for valid exchange or search for
 			if selector.exchange != None:
 				data['exchange'] = selector.exchange
 			else:
-				eId = await dbCon.getExchangeId(data['exchange_code'])
+				eId = await dbCon.getExchangeId(data['exchange_code'], con=dbConn)
 				if eId != None:
 					data['exchange'] = eId
 				else:
@@ -75,21 +123,21 @@ class Mutation(ObjectType):
 
 			# Query currency
 			if 'currency_iso_code' in data.keys():
-				id = await dbCon.getCurrencyId(data['currency_iso_code'])
+				id = await dbCon.getCurrencyId(data['currency_iso_code'], con=dbConn)
 				data['currency'] = id
 				del data['currency_iso_code']
 
 			# Query country
 			if 'country_alpha3' in data.keys():
-				id = await dbCon.getCountryId(data['country_alpha3'])
+				id = await dbCon.getCountryId(data['country_alpha3'], con=dbConn)
 				data['country'] = id
 				del data['country_alpha3']
 
 			# Update or add into database
 			if selector.id != None:
-				result = await dbCon.updateTable('securities', selector.id, data)
+				result = await dbCon.updateTable('securities', selector.id, data, con=dbConn)
 			else:
-				result = await dbCon.insertEntry('securities', data)
+				result = await dbCon.insertEntry('securities', data, con=dbConn)
 			logger.debug(result)
 
 			return {'success':result.success, 'error':result.exception}
@@ -102,26 +150,14 @@ class Mutation(ObjectType):
 	@staticmethod
 	async def resolve_updateSecurityQuotes(_, info:GraphQLResolveInfo, data):
 		try:
-			data = securityInputFilter(data)
-			dbCon = getDbConnectorFromContext(info)
-		
-			# Query existing fields
-			selector = await dbCon.getSecurityAndExchange(data['code'], data['exchange_code'])
-			logger.debug(selector)
-
-			if selector.id == None:
-				return {'success':False, 'error':f'No security {data["code"]}:{data["exchange_code"]} found'} 
-			logger.debug('Start quote update...')
-			result = await dbCon.forceUpdateEntries('quotes', {'security':selector.id}, data['quotes'], 'security_date_uq')
-			logger.debug('Quote update finished!')
-			logger.debug(result)
+			id, response = await Mutation.updateSecurityEntries(info, data, 'quotes', 'security_date_uq')
 
 			# Queue indicator calculation
-			if parseBoolean(os.environ.get('indicatorCalculation')) == True:
+			if id != None and settings.indicatorCalculation == True:
 				th = getTaskHandlerFromContext(info)
-				await th.addJob(BackgroundJobData('quotes', selector.id))
+				await th.addJob(BackgroundJobData('quotes', id))
 
-			return {'success':result.success, 'error':result.exception}
+			return response
 		except Exception as e:
 			logger.error('Error at @mutation.field(updateSecurityQuotes)')
 			logger.error(e)
@@ -131,20 +167,8 @@ class Mutation(ObjectType):
 	@staticmethod
 	async def resolve_updateSplits(_, info:GraphQLResolveInfo, data):
 		try:
-			data = securityInputFilter(data)
-			dbCon = getDbConnectorFromContext(info)
-
-			# Query existing fields
-			selector = await dbCon.getSecurityAndExchange(data['code'], data['exchange_code'])
-			logger.debug(selector)
-
-			if selector.id == None:
-				return {'success':False, 'error':f'No security {data["code"]}:{data["exchange_code"]} found'} 
-
-			result = await dbCon.forceUpdateEntries('splits', {'security':selector.id}, data['splits'], 'splits_security_date_uq')
-			logger.debug(result)
-
-			return {'success':result.success, 'error':result.exception}
+			id, response = await Mutation.updateSecurityEntries(info, data, 'splits', 'splits_security_date_uq')
+			return response
 		except Exception as e:
 			logger.error('Error at @mutation.field(updateSplits)')
 			logger.error(e)
@@ -154,20 +178,8 @@ class Mutation(ObjectType):
 	@staticmethod
 	async def resolve_updateDividends(_, info:GraphQLResolveInfo, data):
 		try:
-			data = securityInputFilter(data)
-			dbCon = getDbConnectorFromContext(info)
-		
-			# Query existing fields
-			selector = await dbCon.getSecurityAndExchange(data['code'], data['exchange_code'])
-			logger.debug(selector)
-
-			if selector.id == None:
-				return {'success':False, 'error':f'No security {data["code"]}:{data["exchange_code"]} found'} 
-
-			result = await dbCon.forceUpdateEntries('dividends', {'security':selector.id}, data['dividends'], 'dividends_security_date_uq')
-			logger.debug(result)
-
-			return {'success':result.success, 'error':result.exception}
+			id, response = await Mutation.updateSecurityEntries(info, data, 'dividends', 'dividends_security_date_uq')
+			return response
 		except Exception as e:
 			logger.error('Error at @mutation.field(updateDividends)')
 			logger.error(e)
@@ -177,20 +189,8 @@ class Mutation(ObjectType):
 	@staticmethod
 	async def resolve_updateOutstandingShares(_, info:GraphQLResolveInfo, data):
 		try:
-			data = securityInputFilter(data)
-			dbCon = getDbConnectorFromContext(info)
-		
-			# Query existing fields
-			selector = await dbCon.getSecurityAndExchange(data['code'], data['exchange_code'])
-			logger.debug(selector)
-
-			if selector.id == None:
-				return {'success':False, 'error':f'No security {data["code"]}:{data["exchange_code"]} found'} 
-
-			result = await dbCon.forceUpdateEntries('outstanding_shares', {'security':selector.id}, data['outstanding_shares'], 'outstanding_shares_security_date_uq')
-			logger.debug(result)
-
-			return {'success':result.success, 'error':result.exception}
+			id, response = await Mutation.updateSecurityEntries(info, data, 'outstanding_shares', 'outstanding_shares_security_date_uq')
+			return response
 		except Exception as e:
 			logger.error('Error at @mutation.field(updateOutstandingShares)')
 			logger.error(e)
@@ -26,7 +26,23 @@ from graphql.type import GraphQLResolveInfo
 from ariadne import load_schema_from_path
 from ariadne_graphql_modules import ObjectType, DeferredType
 
-from context import getDbPoolFromContext
+from context import getDbConnFromContext, getReferenceCacheFromContext, isFieldSelected
+
+
+# Sector SPDR ETFs
+SECTOR_ETFS = ['XLC', 'XLY', 'XLP', 'XLE', 'XLF', 'XLV', 'XLI', 'XLB', 'XLRE', 'XLK', 'XLU']
+
+# Screener name -> (SQL, query arguments), '' is the default screener
+# The latest (matching) indicator row is looked up per security through the
+# (security, date) index instead of sorting the whole join for DISTINCT ON
+SCREENERS = {
+	'': ("SELECT s.*, i.* FROM securities s CROSS JOIN LATERAL (SELECT * FROM indicators WHERE security=s.id ORDER BY date DESC LIMIT 1) i WHERE s.is_delisted=FALSE ORDER BY s.id ASC", ()),
+	'sector-etfs': ("SELECT s.* FROM securities s WHERE s.is_delisted=FALSE AND s.code = ANY($1::text[]) AND EXISTS (SELECT 1 FROM indicators WHERE security=s.id) ORDER BY s.id ASC", (SECTOR_ETFS,)),
+	'adx-long-crossing': ("SELECT s.*, i.* FROM securities s CROSS JOIN LATERAL (SELECT * FROM indicators WHERE security=s.id AND dmi_bull_d IS TRUE AND adx_slope_d IS TRUE AND adx_crossing_date_d IS NOT NULL ORDER BY date DESC LIMIT 1) i WHERE s.is_delisted=FALSE ORDER BY i.adx_crossing_date_d DESC", ()),
+	'adx-short-crossing': ("SELECT s.*, i.* FROM securities s CROSS JOIN LATERAL (SELECT * FROM indicators WHERE security=s.id AND dmi_bull_d IS FALSE AND adx_slope_d IS TRUE AND adx_crossing_date_d IS NOT NULL ORDER BY date DESC LIMIT 1) i WHERE s.is_delisted=FALSE ORDER BY i.adx_crossing_date_d DESC", ()),
+	'adx-bull': ("SELECT s.* FROM securities s WHERE s.is_delisted=FALSE AND EXISTS (SELECT 1 FROM indicators WHERE security=s.id AND dmi_bull_d IS TRUE AND adx_slope_d IS TRUE AND psar_bull_d IS TRUE AND dmi_bull_w IS TRUE AND adx_slope_w IS TRUE AND psar_bull_w IS TRUE AND dmi_bull_m IS TRUE AND adx_slope_m IS TRUE AND psar_bull_m IS TRUE) ORDER BY s.id ASC", ()),
+	'adx-bear': ("SELECT s.* FROM securities s WHERE s.is_delisted=FALSE AND EXISTS (SELECT 1 FROM indicators WHERE security=s.id AND dmi_bull_d IS FALSE AND adx_slope_d IS TRUE AND psar_bull_d IS FALSE AND dmi_bull_w IS FALSE AND adx_slope_w IS TRUE AND psar_bull_w IS FALSE AND dmi_bull_m IS FALSE AND adx_slope_m IS TRUE AND psar_bull_m IS FALSE) ORDER BY s.id ASC", ()),
+}
 
 
 class Query(ObjectType):
@@ -54,10 +70,13 @@ class Query(ObjectType):
 				logger.warning('searchSecurity query without search text, skipping')
 				return []
 			logger.debug(f'searchSecurity({searchText}, {limit})')
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch("SELECT * FROM securities WHERE is_delisted=FALSE AND code ILIKE '%' || $1 || '%' ORDER BY length(code) ASC LIMIT $2;", searchText, limit)
-				return [dict(e) for e in data] if len(data) > 0 else []
+			dbConn = getDbConnFromContext(info)
+			async with dbConn.acquire() as con:
+				if isFieldSelected(info, 'exchange_code'):
+					data = await con.fetch("SELECT *, (SELECT e.code FROM exchanges e WHERE e.id=s.exchange) AS _exchange_code FROM securities s WHERE is_delisted=FALSE AND code ILIKE '%' || $1 || '%' ORDER BY length(code) ASC LIMIT $2;", searchText, limit)
+				else:
+					data = await con.fetch("SELECT * FROM securities WHERE is_delisted=FALSE AND code ILIKE '%' || $1 || '%' ORDER BY length(code) ASC LIMIT $2;", searchText, limit)
+				return data
 		except Exception as e:
 			logger.error('Error at @query.field(searchSecurity)')
 			logger.error(e)
@@ -67,24 +86,15 @@ class Query(ObjectType):
 	@staticmethod
 	async def resolve_screenerSecurities(_, info:GraphQLResolveInfo, name:str=None):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			data = []
-			async with dbPool.acquire() as con:
-				if name == None or name == '':
-					data = await con.fetch("SELECT DISTINCT ON (s.id) s.*, i.* FROM securities s JOIN indicators i ON i.security=s.id WHERE is_delisted=FALSE ORDER BY s.id ASC, i.date DESC")
-				elif name == 'sector-etfs':
-					data = await con.fetch("SELECT DISTINCT ON (s.id) s.* FROM securities s JOIN indicators i ON i.security=s.id WHERE is_delisted=FALSE AND (code='XLC' OR code='XLY' OR code='XLP' OR code='XLE' OR code='XLF' OR code='XLV' OR code='XLI' OR code='XLB' OR code='XLRE' OR code='XLK' OR code='XLU') ORDER BY s.id ASC, i.date DESC")
-				elif name == 'adx-long-crossing':
-					data = await con.fetch("SELECT * FROM (SELECT DISTINCT ON (s.id) s.*, i.* FROM securities s JOIN indicators i ON i.security=s.id WHERE is_delisted=FALSE AND dmi_bull_d IS TRUE AND adx_slope_d IS TRUE AND adx_crossing_date_d IS NOT NULL ORDER BY s.id ASC, i.date DESC) sub ORDER BY adx_crossing_date_d DESC")
-				elif name == 'adx-short-crossing':
-					data = await con.fetch("SELECT * FROM (SELECT DISTINCT ON (s.id) s.*, i.* FROM securities s JOIN indicators i ON i.security=s.id WHERE is_delisted=FALSE AND dmi_bull_d IS FALSE AND adx_slope_d IS TRUE AND adx_crossing_date_d IS NOT NULL ORDER BY s.id ASC, i.date DESC) sub ORDER BY adx_crossing_date_d DESC")
-				elif name == 'adx-bull':
-					data = await con.fetch("SELECT DISTINCT ON (s.id) s.* FROM securities s JOIN indicators i ON i.security=s.id WHERE is_delisted=FALSE AND dmi_bull_d IS TRUE AND adx_slope_d IS TRUE AND psar_bull_d IS TRUE AND dmi_bull_w IS TRUE AND adx_slope_w IS TRUE AND psar_bull_w IS TRUE AND dmi_bull_m IS TRUE AND adx_slope_m IS TRUE AND psar_bull_m IS TRUE ORDER BY s.id ASC, i.date DESC")
-				elif name == 'adx-bear':
-					data = await con.fetch("SELECT DISTINCT ON (s.id) s.* FROM securities s JOIN indicators i ON i.security=s.id WHERE is_delisted=FALSE AND dmi_bull_d IS FALSE AND adx_slope_d IS TRUE AND psar_bull_d IS FALSE AND dmi_bull_w IS FALSE AND adx_slope_w IS TRUE AND psar_bull_w IS FALSE AND dmi_bull_m IS FALSE AND adx_slope_m IS TRUE AND psar_bull_m IS FALSE ORDER BY s.id ASC, i.date DESC")
-				else:
-					logger.warning(f'Unknown screener name {name}')
-			return [dict(e) for e in data] if len(data) > 0 else []
+			dbConn = getDbConnFromContext(info)
+			screener = SCREENERS.get(name or '')
+			if screener == None:
+				logger.warning(f'Unknown screener name {name}')
+				return []
+			sql, args = screener
+			async with dbConn.acquire() as con:
+				data = await con.fetch(sql, *args)
+			return data
 		except Exception as e:
 			logger.error('Error at @query.field(screenerSecurities)')
 			logger.error(e)
@@ -94,10 +104,13 @@ class Query(ObjectType):
 	@staticmethod
 	async def resolve_currencies(_, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
+			data = getReferenceCacheFromContext(info).getAll('currencies')
+			if len(data) > 0:
+				return data
+			dbConn = getDbConnFromContext(info)
+			async with dbConn.acquire() as con:
 				data = await con.fetch('SELECT * FROM currencies;')
-				return [dict(e) for e in data] if len(data) > 0 else []
+				return data
 		except Exception as e:
 			logger.error('Error at @query.field(currencies)')
 			logger.error(e)
@@ -108,10 +121,13 @@ class Query(ObjectType):
 	async def resolve_currency(_, info:GraphQLResolveInfo, id:int=None):
 		try:
 			if id:
-				dbPool = getDbPoolFromContext(info)
-				async with dbPool.acquire() as con:
+				data = getReferenceCacheFromContext(info).get('currencies', id)
+				if data != None:
+					return data
+				dbConn = getDbConnFromContext(info)
+				async with dbConn.acquire() as con:
 					data = await con.fetch('SELECT * FROM currencies WHERE id=$1;', id)
-					return dict(data[0]) if len(data) > 0 else None
+					return data[0] if len(data) > 0 else None
 		except Exception as e:
 			logger.error('Error at @query.field(currency)')
 			logger.error(e)
@@ -121,10 +137,13 @@ class Query(ObjectType):
 	@staticmethod
 	async def resolve_countries(_, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
+			data = getReferenceCacheFromContext(info).getAll('countries')
+			if len(data) > 0:
+				return data
+			dbConn = getDbConnFromContext(info)
+			async with dbConn.acquire() as con:
 				data = await con.fetch('SELECT * FROM countries;')
-				return [dict(e) for e in data] if len(data) > 0 else []
+				return data
 		except Exception as e:
 			logger.error('Error at @query.field(countries)')
 			logger.error(e)
@@ -135,10 +154,13 @@ class Query(ObjectType):
 	async def resolve_country(_, info:GraphQLResolveInfo, id:int=None):
 		try:
 			if id:
-				dbPool = getDbPoolFromContext(info)
-				async with dbPool.acquire() as con:
+				data = getReferenceCacheFromContext(info).get('countries', id)
+				if data != None:
+					return data
+				dbConn = getDbConnFromContext(info)
+				async with dbConn.acquire() as con:
 					data = await con.fetch('SELECT * FROM countries WHERE id=$1;', id)
-					return dict(data[0]) if len(data) > 0 else None
+					return data[0] if len(data) > 0 else None
 		except Exception as e:
 			logger.error('Error at @query.field(country)')
 			logger.error(e)
@@ -148,10 +170,10 @@ class Query(ObjectType):
 	@staticmethod
 	async def resolve_exchanges(_, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT *, (CASE WHEN virtual_exchange IS NULL THEN FALSE ELSE (code=virtual_exchange) END) AS virtual FROM exchanges;')
-				return [dict(e) for e in data] if len(data) > 0 else []
+			dbConn = getDbConnFromContext(info)
+			async with dbConn.acquire() as con:
+				data = await con.fetch('SELECT * FROM exchanges;')
+				return data
 		except Exception as e:
 			logger.error('Error at @query.field(exchanges)')
 			logger.error(e)
@@ -162,10 +184,10 @@ class Query(ObjectType):
 	async def resolve_exchange(_, info:GraphQLResolveInfo, id:int=None):
 		try:
 			if id:
-				dbPool = getDbPoolFromContext(info)
-				async with dbPool.acquire() as con:
+				dbConn = getDbConnFromContext(info)
+				async with dbConn.acquire() as con:
 					data = await con.fetch('SELECT * FROM exchanges WHERE id=$1;', id)
-					return dict(data[0]) if len(data) > 0 else None
+					return data[0] if len(data) > 0 else None
 		except Exception as e:
 			logger.error('Error at @query.field(exchange)')
 			logger.error(e)
@@ -175,10 +197,13 @@ class Query(ObjectType):
 	@staticmethod
 	async def resolve_gics_codes(_, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
+			data = getReferenceCacheFromContext(info).getAll('gics_codes')
+			if len(data) > 0:
+				return data
+			dbConn = getDbConnFromContext(info)
+			async with dbConn.acquire() as con:
 				data = await con.fetch('SELECT * FROM gics_codes ORDER BY id ASC;')
-				return [dict(e) for e in data] if len(data) > 0 else []
+				return data
 		except Exception as e:
 			logger.error('Error at @query.field(gics_codes)')
 			logger.error(e)
@@ -189,10 +214,13 @@ class Query(ObjectType):
 	async def resolve_gics_code(_, info:GraphQLResolveInfo, id:int=None):
 		try:
 			if id:
-				dbPool = getDbPoolFromContext(info)
-				async with dbPool.acquire() as con:
+				data = getReferenceCacheFromContext(info).get('gics_codes', id)
+				if data != None:
+					return data
+				dbConn = getDbConnFromContext(info)
+				async with dbConn.acquire() as con:
 					data = await con.fetch('SELECT * FROM gics_codes WHERE id=$1;', id)
-					return dict(data[0]) if len(data) > 0 else None
+					return data[0] if len(data) > 0 else None
 		except Exception as e:
 			logger.error('Error at @query.field(gics_code)')
 			logger.error(e)
@@ -202,10 +230,13 @@ class Query(ObjectType):
 	@staticmethod
 	async def resolve_securities(_, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM securities;')
-				return [dict(e) for e in data] if len(data) > 0 else []
+			dbConn = getDbConnFromContext(info)
+			async with dbConn.acquire() as con:
+				if isFieldSelected(info, 'exchange_code'):
+					data = await con.fetch('SELECT *, (SELECT e.code FROM exchanges e WHERE e.id=s.exchange) AS _exchange_code FROM securities s;')
+				else:
+					data = await con.fetch('SELECT * FROM securities;')
+				return data
 		except Exception as e:
 			logger.error('Error at @query.field(securities)')
 			logger.error(e)
@@ -216,10 +247,10 @@ class Query(ObjectType):
 	async def resolve_security(_, info:GraphQLResolveInfo, id:int=None):
 		try:
 			if id:
-				dbPool = getDbPoolFromContext(info)
-				async with dbPool.acquire() as con:
+				dbConn = getDbConnFromContext(info)
+				async with dbConn.acquire() as con:
 					data = await con.fetch('SELECT * FROM securities WHERE id=$1;', id)
-					return dict(data[0]) if len(data) > 0 else None
+					return data[0] if len(data) > 0 else None
 		except Exception as e:
 			logger.error('Error at @query.field(security)')
 			logger.error(e)
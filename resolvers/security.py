@@ -19,7 +19,7 @@
  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from datetime import date
+from datetime import date, timedelta
 from log_config import logger
 
 from graphql.type import GraphQLResolveInfo
@@ -27,7 +27,7 @@ from graphql.type import GraphQLResolveInfo
 from ariadne import load_schema_from_path
 from ariadne_graphql_modules import ObjectType, DeferredType
 
-from context import getDbPoolFromContext
+from context import getLoadersFromContext, getReferenceCacheFromContext
 
 
 class Security(ObjectType):
@@ -56,10 +56,12 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_currency(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM currencies WHERE id=$1;', obj['currency'])
-				return dict(data[0]) if len(data) == 1 else None
+			if obj['currency'] == None:
+				return None
+			data = getReferenceCacheFromContext(info).get('currencies', obj['currency'])
+			if data != None:
+				return data
+			return await getLoadersFromContext(info).currency.load(obj['currency'])
 		except Exception as e:
 			logger.error('Error at @security.field(currency)')
 			logger.error(e)
@@ -69,10 +71,12 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_country(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM countries WHERE id=$1;', obj['country'])
-				return dict(data[0]) if len(data) == 1 else None
+			if obj['country'] == None:
+				return None
+			data = getReferenceCacheFromContext(info).get('countries', obj['country'])
+			if data != None:
+				return data
+			return await getLoadersFromContext(info).country.load(obj['country'])
 		except Exception as e:
 			logger.error('Error at @security.field(country)')
 			logger.error(e)
@@ -80,12 +84,12 @@ class Security(ObjectType):
 	
 
 	@staticmethod
-	async def resolve_quotes(obj, info:GraphQLResolveInfo, start:date=date(1970,1,1), end:date=date(2100,12,31)):
+	async def resolve_quotes(obj, info:GraphQLResolveInfo, start:date=date(1970,1,1), end:date=date(2100,12,31), after:date=None, limit:int=None):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT date, open, high, low, close, split_adjusted_open, split_adjusted_high, split_adjusted_low, split_adjusted_close, adjusted_close, volume FROM quotes WHERE security=$1 AND date >= $2 AND date <= $3 ORDER BY date ASC;', obj['id'], start, end)
-				return [dict(e) for e in data]
+			# Cursor: only entries after the last received date
+			if after != None:
+				start = max(start, after + timedelta(days=1))
+			return await getLoadersFromContext(info).quotes.load((obj['id'], start, end, limit))
 		except Exception as e:
 			logger.error('Error at @security.field(quotes)')
 			logger.error(e)
@@ -95,10 +99,7 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_last_quote(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM quotes WHERE security=$1 ORDER BY date DESC LIMIT 1;', obj['id'])
-				return dict(data[0])
+			return await getLoadersFromContext(info).lastQuote.load(obj['id'])
 		except Exception as e:
 			logger.error('Error at @security.field(last_quote)')
 			logger.error(e)
@@ -108,10 +109,7 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_splits(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT date, old, new FROM splits WHERE security=$1 ORDER BY date ASC;', obj['id'])
-				return [dict(e) for e in data]
+			return await getLoadersFromContext(info).splits.load(obj['id'])
 		except Exception as e:
 			logger.error('Error at @security.field(splits)')
 			logger.error(e)
@@ -121,10 +119,7 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_dividends(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT date, declaration_date, record_date, payment_date, period, adjusted_value, value FROM dividends WHERE security=$1 ORDER BY date ASC;', obj['id'])
-				return [dict(e) for e in data]
+			return await getLoadersFromContext(info).dividends.load(obj['id'])
 		except Exception as e:
 			logger.error('Error at @security.field(dividends)')
 			logger.error(e)
@@ -134,10 +129,7 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_analyst_ratings(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT date_added, rating, target_price, strong_buy, buy, hold, sell, strong_sell FROM analyst_ratings WHERE security=$1 ORDER BY date_added ASC;', obj['id'])
-				return [dict(e) for e in data]
+			return await getLoadersFromContext(info).analystRatings.load(obj['id'])
 		except Exception as e:
 			logger.error('Error at @security.field(analyst_ratings)')
 			logger.error(e)
@@ -147,10 +139,7 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_etf_data(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT company_name, company_url, etf_url, yield, dividend_paying_frequency, inception_date, total_assets, holdings_count FROM etf_data WHERE security=$1;', obj['id'])
-				return dict(data[0]) if len(data) > 0 else None
+			return await getLoadersFromContext(info).etfData.load(obj['id'])
 		except Exception as e:
 			logger.error('Error at @security.field(etf_data)')
 			logger.error(e)
@@ -160,15 +149,7 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_indicators(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM indicators WHERE security=$1 ORDER BY date DESC LIMIT 1;', obj['id'])
-				result = None
-				if data != None and len(data) > 0:
-					result = dict(data[0])
-					# Remove foreign key
-					del result['security']
-				return result
+			return await getLoadersFromContext(info).indicators.load(obj['id'])
 		except Exception as e:
 			logger.error('Error at @security.field(indicators)')
 			logger.error(e)
@@ -178,13 +159,9 @@ class Security(ObjectType):
 	@staticmethod
 	async def resolve_exchange(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT * FROM exchanges WHERE id=$1 LIMIT 1;', obj['exchange'])
-				result = None
-				if data != None and len(data) > 0:
-					result = dict(data[0])
-				return result
+			if obj['exchange'] == None:
+				return None
+			return await getLoadersFromContext(info).exchange.load(obj['exchange'])
 		except Exception as e:
 			logger.error('Error at @security.field(exchange)')
 			logger.error(e)
@@ -192,15 +169,20 @@ class Security(ObjectType):
 	
 
 	@staticmethod
-	async def resolve_exchange_code(obj, info:GraphQLResolveInfo):
+	def resolve_exchange_code(obj, info:GraphQLResolveInfo):
+		# Already joined by the parent query, resolve without a coroutine
+		if '_exchange_code' in obj:
+			return obj['_exchange_code']
+		return Security.loadExchangeCode(obj, info)
+
+
+	@staticmethod
+	async def loadExchangeCode(obj, info:GraphQLResolveInfo):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT code AS exchange_code FROM exchanges WHERE id=$1 LIMIT 1;', obj['exchange'])
-				result = None
-				if data != None and len(data) > 0:
-					result =data[0]['exchange_code']
-				return result
+			if obj['exchange'] == None:
+				return None
+			data = await getLoadersFromContext(info).exchange.load(obj['exchange'])
+			return data['code'] if data != None else None
 		except Exception as e:
 			logger.error('Error at @security.field(exchange_code)')
 			logger.error(e)
@@ -208,12 +190,12 @@ class Security(ObjectType):
 	
 
 	@staticmethod
-	async def resolve_outstanding_shares(obj, info:GraphQLResolveInfo, start:date=date(1970,1,1), end:date=date(2100,12,31)):
+	async def resolve_outstanding_shares(obj, info:GraphQLResolveInfo, start:date=date(1970,1,1), end:date=date(2100,12,31), after:date=None, limit:int=None):
 		try:
-			dbPool = getDbPoolFromContext(info)
-			async with dbPool.acquire() as con:
-				data = await con.fetch('SELECT date, outstanding_shares FROM outstanding_shares WHERE security=$1 AND date >= $2 AND date <= $3 ORDER BY date ASC;', obj['id'], start, end)
-				return [dict(e) for e in data]
+			# Cursor: only entries after the last received date
+			if after != None:
+				start = max(start, after + timedelta(days=1))
+			return await getLoadersFromContext(info).outstandingShares.load((obj['id'], start, end, limit))
 		except Exception as e:
 			logger.error('Error at @security.field(outstanding_shares)')
 			logger.error(e)
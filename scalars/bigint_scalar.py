@@ -22,40 +22,5 @@
 # 12345678910111213
 from ariadne import ScalarType
 
-def serializer(value:int) -> str:
-	"""Serializer for custom GrapQL scalar **BigInt**
-
-	Args:
-		value (int): Python integer value
-
-	Raises:
-		ValueError: Error if invalid BigInt
-
-	Returns:
-		str: String with BigInt representation (string of int)
-	"""
-	try:
-		return str(value)
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid integer')
-
-
-def value_parser(value:str) -> int:
-	"""Value parser for custom GrapQL scalar **BigInt**
-
-	Args:
-		value (str): String with BigInt representation
-
-	Raises:
-		ValueError: Error if invalid string
-
-	Returns:
-		int: Converted BigInt object
-	"""
-	try:
-		return int(value)
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid BigInt string')
-
-
-bigintScalar = ScalarType('BigInt', serializer=serializer, value_parser=value_parser)
\ No newline at end of file
+# Plain str/int, int() parses strings base 10 and raises ValueError on invalid input
+bigintScalar = ScalarType('BigInt', serializer=str, value_parser=int)
\ No newline at end of file
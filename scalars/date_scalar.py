@@ -21,43 +21,10 @@
 
 # 2023-08-02
 from ariadne import ScalarType
+from operator import methodcaller
 from datetime import date
 
-
-def serializer(value:date) -> str:
-	"""Serializer for custom GrapQL scalar **Date**
-
-	Args:
-		value (date): datetime.date object
-
-	Raises:
-		ValueError: If no valid date
-
-	Returns:
-		str: String with parsed date in ISO format like 2024-01-12
-	"""
-	try:
-		return value.isoformat()
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid date')
-
-
-def value_parser(value:str) -> date:
-	"""Value parser for custom GrapQL scalar **Date**
-
-	Args:
-		value (str): String of ISO formatted date
-
-	Raises:
-		ValueError: If no valid string in ISO format
-
-	Returns:
-		date: Parsed datetime.date object
-	"""
-	try:
-		return  date.fromisoformat(value)
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid ISO date string')
-
-
-dateScalar = ScalarType('Date', serializer=serializer, value_parser=value_parser)
\ No newline at end of file
+# C callables without a Python frame per field, graphql-core reports the raised errors
+# methodcaller keeps value.isoformat() dispatch (a datetime value is serialized as before)
+# date.fromisoformat is the fastest parser for YYYY-MM-DD, a cache or slicing is slower
+dateScalar = ScalarType('Date', serializer=methodcaller('isoformat'), value_parser=date.fromisoformat)
\ No newline at end of file
@@ -22,42 +22,8 @@
 # ISO-8601
 # 2025-01-06T14:41:05+0000
 from ariadne import ScalarType
+from operator import methodcaller
 from datetime import datetime
 
-def serializer(value:datetime) -> str:
-	"""Serializer for custom GrapQL scalar **Datetime**
-
-	Args:
-		value (datetime): Datetime object to convert
-
-	Raises:
-		ValueError: Error if invalid datetime
-
-	Returns:
-		str: String with datetime representation
-	"""
-	try:
-		return value.isoformat()
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid datetime string')
-
-
-def value_parser(value:str) -> datetime:
-	"""Value parser for custom GrapQL scalar **Datetime**
-
-	Args:
-		value (str): String with datetime representation
-
-	Raises:
-		ValueError: Error if invalid string
-
-	Returns:
-		time: Converted datetime object
-	"""
-	try:
-		return datetime.fromisoformat(value)
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid datetime string')
-
-
-datetimeScalar = ScalarType('Datetime', serializer=serializer, value_parser=value_parser)
\ No newline at end of file
+# No Python wrappers, e.g. the last_update of every security is serialized per request
+datetimeScalar = ScalarType('Datetime', serializer=methodcaller('isoformat'), value_parser=datetime.fromisoformat)
\ No newline at end of file
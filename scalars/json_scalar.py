@@ -21,20 +21,77 @@
 
 from ariadne import ScalarType
 import json
+import orjson
 from decimal import Decimal
 from datetime import date, time
 
+# Resolved once at import, the serializer runs for every JSON field
+_dumps = orjson.dumps
+_loads = orjson.loads
+_JSONEncodeError = orjson.JSONEncodeError
+_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS
 
-class CustomEncoder(json.JSONEncoder):
-	"""Custom JSON encoder to convert Decimal and time/date types
+
+def _default(obj):
+	"""orjson fallback for Decimal, date/time types are serialized natively
+
+	Args:
+		obj (Any): Value orjson can't serialize
+
+	Raises:
+		TypeError: If the type is not serializable
+
+	Returns:
+		str: Decimal number string
+	"""
+	if isinstance(obj, Decimal):
+		return str(obj)
+	raise TypeError
+
+
+def _coerceKey(key) -> str:
+	"""Convert a dict key like json.dumps()
+
+	Args:
+		key (Any): Dict key
+
+	Raises:
+		TypeError: If the key type is not supported by JSON
+
+	Returns:
+		str: String key
+	"""
+	if isinstance(key, str):
+		return key
+	if key is None or isinstance(key, (int, float)):
+		# None -> "null", True -> "true", 1.5 -> "1.5"
+		return json.dumps(key)
+	raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
+
+
+def _coerce(obj):
+	"""Convert a value to JSON compatible types, same result as a json.dumps()/json.loads() round trip
+
+	Args:
+		obj (Any): Value to convert
+
+	Raises:
+		TypeError: If the type is not serializable
+
+	Returns:
+		Any: Value with converted Decimal and time/date
 	"""
-	def default(self, obj):
-		if isinstance(obj, Decimal):
-			return str(obj)
-		elif isinstance(obj, date) or isinstance(obj, time):
-			return obj.isoformat()
-		# Base class
-		return super().default(obj)
+	if obj is None or isinstance(obj, (str, int, float)):
+		return obj
+	if isinstance(obj, Decimal):
+		return str(obj)
+	if isinstance(obj, (date, time)):
+		return obj.isoformat()
+	if isinstance(obj, dict):
+		return {_coerceKey(k): _coerce(v) for k, v in obj.items()}
+	if isinstance(obj, (list, tuple)):
+		return [_coerce(v) for v in obj]
+	raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
 
 
 def serializer(value:dict) -> dict:
@@ -50,8 +107,12 @@ def serializer(value:dict) -> dict:
 		dict: Dict/JSON with converted decimal and time/date
 	"""
 	try:
-		return json.loads(json.dumps(value, cls=CustomEncoder))
-	except (ValueError, TypeError):
+		try:
+			return _loads(_dumps(value, default=_default, option=_DUMPS_OPTIONS))
+		except _JSONEncodeError:
+			# E.g. integers beyond 64 bit
+			return _coerce(value)
+	except (ValueError, TypeError, RecursionError):
 		raise ValueError(f'"{value}" is not a valid JSON string')
 
 
@@ -21,42 +21,8 @@
 
 # 01:12:45
 from ariadne import ScalarType
+from operator import methodcaller
 from datetime import time
 
-def serializer(value:time) -> str:
-	"""Serializer for custom GrapQL scalar **Time**
-
-	Args:
-		value (time): Time object to convert
-
-	Raises:
-		ValueError: Error if invalid time
-
-	Returns:
-		str: String with time representation
-	"""
-	try:
-		return value.isoformat()
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid time string')
-
-
-def value_parser(value:str) -> time:
-	"""Value parser for custom GrapQL scalar **Time**
-
-	Args:
-		value (str): String with time representation
-
-	Raises:
-		ValueError: Error if invalid string
-
-	Returns:
-		time: Converted time object
-	"""
-	try:
-		return time.fromisoformat(value)
-	except (ValueError, TypeError):
-		raise ValueError(f'"{value}" is not a valid time string')
-
-
-timeScalar = ScalarType('Time', serializer=serializer, value_parser=value_parser)
\ No newline at end of file
+# Bound directly, invalid values raise in isoformat()/fromisoformat()
+timeScalar = ScalarType('Time', serializer=methodcaller('isoformat'), value_parser=time.fromisoformat)
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+ @copyright Copyright (C) 2024 Dennis Greguhn <dev@greguhn.de>
+ 
+ @author Dennis Greguhn <dev@greguhn.de>
+ 
+ @license AGPL-3.0-or-later
+ 
+ This program is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as
+ published by the Free Software Foundation, either version 3 of the
+ License, or (at your option) any later version.
+ 
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+ 
+ You should have received a copy of the GNU Affero General Public License
+ along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+from dataclasses import dataclass
+
+from utils import parseBoolean, parseInt
+
+# For .env file
+from dotenv import load_dotenv
+load_dotenv()
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+	"""Application settings, read once from the environment (.env)"""
+	# General
+	debug: bool
+	backend_log_level: str
+
+	# Task Handler
+	indicatorCalculation: bool
+	parallelProcesses: int
+
+	# uvicorn application
+	host: str
+	port: int
+	workers: int
+	timeout_keep_alive: int
+	limit_concurrency: int
+
+	# GraphQL API
+	gql_path: str
+	introspection: bool
+	token_path: str
+	cors_origins: tuple
+
+	# PostgreSQL Database
+	postgres_address: str
+	postgres_port: str
+	postgres_username: str
+	postgres_password: str
+	postgres_database: str
+	postgres_pool_min_size: int
+	postgres_pool_max_size: int
+	postgres_pool_timeout: int
+	postgres_statement_cache_size: int
+	postgres_max_cacheable_statement_size: int
+	postgres_pgbouncer: bool
+	reference_cache_refresh: int
+	pg_dsn: str
+
+	# Valkey
+	valkey_host: str
+	valkey_port: int
+	valkey_db: int
+	valkey_max_connections: int
+
+
+def loadSettings() -> Settings:
+	"""Create the settings from the current environment
+
+	Returns:
+		Settings: Frozen settings object
+	"""
+	env = os.environ
+	return Settings(
+		debug = parseBoolean(env.get('debug')),
+		backend_log_level = env.get('backend_log_level'),
+
+		indicatorCalculation = parseBoolean(env.get('indicatorCalculation')),
+		parallelProcesses = parseInt(env.get('parallelProcesses'), None),
+
+		host = env.get('host'),
+		port = parseInt(env.get('port'), 8042),
+		workers = parseInt(env.get('workers'), 1),
+		timeout_keep_alive = parseInt(env.get('timeout_keep_alive'), 30),
+		limit_concurrency = parseInt(env.get('limit_concurrency'), None),
+
+		gql_path = env.get('gql_path'),
+		introspection = parseBoolean(env.get('introspection')),
+		token_path = env.get('token_path'),
+		cors_origins = tuple([o.strip() for o in env.get('cors_origins', '*').split(',') if o.strip() != '']),
+
+		postgres_address = env.get('postgres_address'),
+		postgres_port = env.get('postgres_port'),
+		postgres_username = env.get('postgres_username'),
+		postgres_password = env.get('postgres_password'),
+		postgres_database = env.get('postgres_database'),
+		postgres_pool_min_size = parseInt(env.get('postgres_pool_min_size'), 5),
+		postgres_pool_max_size = parseInt(env.get('postgres_pool_max_size'), 20),
+		postgres_pool_timeout = parseInt(env.get('postgres_pool_timeout'), 60),
+		postgres_statement_cache_size = parseInt(env.get('postgres_statement_cache_size'), 256),
+		postgres_max_cacheable_statement_size = parseInt(env.get('postgres_max_cacheable_statement_size'), 64 * 1024),
+		postgres_pgbouncer = parseBoolean(env.get('postgres_pgbouncer')),
+		reference_cache_refresh = parseInt(env.get('reference_cache_refresh'), 300),
+		pg_dsn = 'postgresql://{0}:{1}@{2}:{3}/{4}'.format(
+			env.get('postgres_username'),
+			env.get('postgres_password'),
+			env.get('postgres_address'),
+			env.get('postgres_port'),
+			env.get('postgres_database')
+		),
+
+		valkey_host = env.get('valkey_host'),
+		valkey_port = parseInt(env.get('valkey_port'), 6379),
+		valkey_db = parseInt(env.get('valkey_db'), 0),
+		valkey_max_connections = parseInt(env.get('valkey_max_connections'), 32),
+	)
+
+
+settings = loadSettings()
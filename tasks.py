@@ -22,23 +22,24 @@
 from __future__ import annotations
 
 import multiprocessing
-import os
 import json
+import orjson
 from uuid import uuid4
 import asyncio
-from multiprocessing import Pool
-from datetime import datetime, timezone
-from dataclasses import dataclass, is_dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
+import time
+import math
+from dataclasses import dataclass
 
 import asyncpg
 
-from utils import parseInt
+from settings import settings
 from log_config import getNewLogger
 from database import DatabaseConnector
-from indicator_factory import IndicatorFactory
+from indicator_factory import IndicatorFactory, initWorker, setWorkerConfig
 
 
-@dataclass
+@dataclass(slots=True)
 class BackgroundJobData:
 	"""Class to handle open tasks to queue"""
 	timestamp: int
@@ -57,7 +58,7 @@ class BackgroundJobData:
 		id2: int = None,
 		date1: str = None,
 		date2: str = None,
-		data: dict = {},
+		data: dict = None,
 		timestamp: int = None,
 		uuid: str = None
 	):
@@ -66,9 +67,9 @@ class BackgroundJobData:
 		self.id2 = id2
 		self.date1 = date1
 		self.date2 = date2
-		self.data = data
+		self.data = data if data != None else {}
 		# Addidional for logging and filtering
-		self.timestamp = timestamp if timestamp != None else int(datetime.utcnow().timestamp())
+		self.timestamp = timestamp if timestamp != None else int(time.time())
 		self.uuid = uuid if uuid != None else str(uuid4())
 	
 
@@ -80,13 +81,13 @@ class BackgroundJobData:
 			id2 = dictIn['id2'],
 			date1 = dictIn['date1'],
 			date2 = dictIn['date2'],
-			data = dictIn['data'],
+			data = dictIn.get('data'),
 			timestamp = dictIn['timestamp'],
 			uuid = dictIn['uuid']
 		)
 
 
-@dataclass
+@dataclass(slots=True)
 class BackgroundJobResult:
 	"""Class to return background processing task results"""
 	timestamp: int
@@ -100,18 +101,33 @@ class BackgroundJobResult:
 		success: bool,
 		exception: Exception = None
 	):
-		self.timestamp = int(datetime.now(tz=timezone.utc).timestamp())
+		self.timestamp = int(time.time())
 		self.data = data
 		self.success = success
 		self.exception = exception
 
 
-class EnhancedJSONEncoder(json.JSONEncoder):
-	"""Custom JSON encoder to also encode dataclasses"""
-	def default(self, o):
-		if is_dataclass(o):
-			return asdict(o)
-		return super().default(o)
+# Maximum number of queued jobs processed by one worker call
+MAX_JOB_BATCH = 64
+
+
+def _initTaskWorker(config:dict):
+	"""Initializer of the TaskHandler worker processes.
+
+	A failing initializer would break the whole process pool, so errors are only logged.
+	Without a worker connection pool calculateMultiprocessingBatch uses a temporary one.
+
+	Args:
+		config (dict): Indicator configuration, parsed once per worker.
+	"""
+	try:
+		setWorkerConfig(config)
+	except Exception as e:
+		getNewLogger('task-worker').error(f'Invalid indicator configuration: {e}')
+	try:
+		initWorker()
+	except Exception as e:
+		getNewLogger('task-worker').error(f'Unable to create worker connection pool: {e}')
 
 
 class TaskHandler:
@@ -119,6 +135,7 @@ class TaskHandler:
 	dbCon:DatabaseConnector = None
 	factory:IndicatorFactory = None
 	parallelProcesses:int = None
+	processPool:ProcessPoolExecutor = None
 	
 	def __init__(self, dbCon:DatabaseConnector):
 		"""Init method
@@ -135,10 +152,14 @@ class TaskHandler:
 			self.parallelProcesses = 1
 			self.logger.warning(f'Unable to read CPU count, fallback to 1 process')
 
-		self.parallelProcesses = parseInt(os.environ.get('parallelProcesses'), self.parallelProcesses)
+		if settings.parallelProcesses != None:
+			self.parallelProcesses = settings.parallelProcesses
+		self.parallelProcesses = max(1, self.parallelProcesses)
 		self.logger.info(f'Using {self.parallelProcesses} process to calculate indicators')
 		self.jobQueue = asyncio.Queue()
 		self.backgroundTasks = set()
+		# One slot per worker process
+		self.slots = asyncio.Semaphore(self.parallelProcesses)
 		self.shutdownRequest = False
 		self.factory = IndicatorFactory(dbCon)
 
@@ -146,6 +167,10 @@ class TaskHandler:
 		with open('indicators.json', 'r') as f:
 			self.indicatorConfig = json.loads(f.read())
 
+		# Persistent worker processes, each with its own psycopg2 connection pool and
+		# the preparsed configuration (pickled once per worker, not for every job)
+		self.processPool = ProcessPoolExecutor(max_workers=self.parallelProcesses, initializer=_initTaskWorker, initargs=(self.indicatorConfig,))
+
 		# Init task scheduling timer
 		self.task = asyncio.ensure_future(self.scheduleTasks())
 
@@ -158,19 +183,26 @@ class TaskHandler:
 		"""
 		returnValue = False
 		try:
-			with open('jobs.json', 'r') as f:
-				backup = json.loads(f.read())
-				if backup != None and type(backup) == list:
-					if len(backup) > 0:
-						for job in backup:
-							self.logger.debug(f'Load backup job {job}')
-							await self.jobQueue.put(BackgroundJobData.fromDict(job))
-						self.logger.info(f'Loaded {self.jobQueue.qsize()} backuped jobs from file')
-						returnValue = True
+			count = 0
+			# One JSON object per line, the queue is unbounded so put_nowait() never blocks
+			with open('jobs.json', 'rb') as f:
+				for line in f:
+					if line.strip() == b'':
+						continue
+					if count == 0 and line.lstrip().startswith(b'['):
+						# Old backup format with a single JSON list
+						jobs = orjson.loads(line + f.read())
 					else:
-						self.logger.info(f'No jobs in backup file')
-				else:
-					self.logger.warning('Backup file "jobs.json" contains no valid job backup')
+						jobs = [orjson.loads(line)]
+					for job in jobs:
+						self.logger.debug(f'Load backup job {job}')
+						self.jobQueue.put_nowait(BackgroundJobData.fromDict(job))
+						count += 1
+			if count > 0:
+				self.logger.info(f'Loaded {count} backuped jobs from file')
+				returnValue = True
+			else:
+				self.logger.info(f'No jobs in backup file')
 		except Exception as e:
 			self.logger.warning(f'Unable to load file "jobs.json"')
 			self.logger.warning(e)
@@ -202,48 +234,59 @@ class TaskHandler:
 			while len(self.backgroundTasks) > 0:
 				self.logger.info(f'Wait for {len(self.backgroundTasks)} tasks to finish...')
 				await asyncio.sleep(1)
+			# Join the worker processes without blocking the event loop
+			await asyncio.to_thread(self.processPool.shutdown, True)
 		except Exception as e:
 			self.logger.error(e)
 		
 		# Backup all jobs
 		try:
-			# dequeue oll objects...
-			jobs = []
-			while self.jobQueue.qsize() > 0:
-				jobs.append(await self.jobQueue.get())
-			# ...and dump to file
-			self.logger.info(f'Write {len(jobs)} jobs to "jobs.json" backup file')
-			with open('jobs.json', 'w') as f:
-				f.write(json.dumps(jobs, cls=EnhancedJSONEncoder))
+			# Dequeue and write all jobs line by line (JSONL)
+			count = 0
+			with open('jobs.json', 'wb') as f:
+				while self.jobQueue.qsize() > 0:
+					f.write(orjson.dumps(self.jobQueue.get_nowait(), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE))
+					count += 1
+			self.logger.info(f'Wrote {count} jobs to "jobs.json" backup file')
 		except Exception as e:
 			self.logger.error(e)
 	
 
-	async def processingTask(self, jobData:BackgroundJobData) -> BackgroundJobResult:
-		"""Processing task function.
+	async def processingTask(self, jobs:list[BackgroundJobData]) -> list[BackgroundJobResult]:
+		"""Processing task function for a batch of jobs.
+
+		All quotes jobs of the batch are calculated with one call in a single worker process.
 
 		Args:
-			jobData (BackgroundJobData): Job data from the queue.
+			jobs (list[BackgroundJobData]): Jobs from the queue.
 
 		Returns:
-			BackgroundJobResult: Result object with information about the execution.
+			list[BackgroundJobResult]: Result objects with information about the execution.
 		"""
-		self.logger.debug(f'processingTask({jobData})')
+		self.logger.debug(f'processingTask({jobs})')
 		try:
+			results = []
+			quoteJobs = []
 			# Different jobs after updates
-			if jobData.table == 'quotes':
-				# TODO: Save process to check!
-				p = multiprocessing.Process(target=self.factory.calculateMultiprocessing, args=(jobData.id1, self.indicatorConfig))
-				p.start()
-			elif jobData.table == 'securities':
-				pass
-			else:
-				self.logger.warning(f'No background processing job for table "{jobData.table}" defined')
-			return BackgroundJobResult(jobData, True)
+			for jobData in jobs:
+				if jobData.table == 'quotes':
+					quoteJobs.append(jobData)
+				elif jobData.table == 'securities':
+					results.append(BackgroundJobResult(jobData, True))
+				else:
+					self.logger.warning(f'No background processing job for table "{jobData.table}" defined')
+					results.append(BackgroundJobResult(jobData, True))
+			if len(quoteJobs) > 0:
+				# Unique IDs, same order
+				ids = list(dict.fromkeys([j.id1 for j in quoteJobs]))
+				loop = asyncio.get_running_loop()
+				success = await loop.run_in_executor(self.processPool, IndicatorFactory.calculateMultiprocessingBatch, ids)
+				results += [BackgroundJobResult(j, success.get(j.id1, False)) for j in quoteJobs]
+			return results
 		except Exception as e:
-			self.logger.error(f'Error at processing task for {jobData}')
+			self.logger.error(f'Error at processing task for {jobs}')
 			self.logger.error(e)
-			return BackgroundJobResult(jobData, False, e)
+			return [BackgroundJobResult(jobData, False, e) for jobData in jobs]
 
 
 	def taskFinishedCallback(self, task:asyncio.Task):
@@ -253,41 +296,53 @@ class TaskHandler:
 			task (asyncio.Task): The finished task object.
 		"""
 		try:
-			result:BackgroundJobResult = task.result()
-			job = f'"{result.data.table}" with data={result.data} and ID {result.data.uuid}'
-			if result.success == True:
-				self.logger.info(f'Job successfully finished | {job}')
-			else:
-				self.logger.warning(f'Job error | {job}, error={result.exception}')
+			result:BackgroundJobResult
+			for result in task.result():
+				job = f'"{result.data.table}" with data={result.data} and ID {result.data.uuid}'
+				if result.success == True:
+					self.logger.info(f'Job successfully finished | {job}')
+				else:
+					self.logger.warning(f'Job error | {job}, error={result.exception}')
 		except Exception as e:
-			self.logger.warning(f'Error while processing job callback | {job}, error={result.exception}')
+			self.logger.warning(f'Error while processing job callback')
 			self.logger.warning(e)
 
 
+	def releaseSlot(self, task:asyncio.Task):
+		"""Callback function to free the worker slot of a finished **processingTask**.
+
+		Args:
+			task (asyncio.Task): The finished task object.
+		"""
+		self.backgroundTasks.discard(task)
+		self.slots.release()
+		if len(self.backgroundTasks) == 0 and self.jobQueue.qsize() == 0:
+			self.logger.info(f'All processes finished!')
+
+
 	async def scheduleTasks(self):
 		"""Always running task function to check queued jobs and start them."""
-		workingOnTasks = False
 		try:
 			# Endless loop to create new tasks unless shutdown is not requested
 			while self.shutdownRequest == False:
-				while len(multiprocessing.active_children()) < self.parallelProcesses and self.jobQueue.qsize() > 0:
+				# Wait for a free worker, then for the next job (no polling)
+				await self.slots.acquire()
+				try:
 					jobData:BackgroundJobData = await self.jobQueue.get()
-					# Different jobs after updates
-					if jobData.table == 'quotes':
-						p = multiprocessing.Process(target=self.factory.calculateMultiprocessing, args=(jobData.id1, self.indicatorConfig))
-						p.start()
-					else:
-						self.logger.warning(f'No background processing job for table "{jobData.table}" defined')
-
+				except BaseException:
+					self.slots.release()
+					raise
+				# Take more waiting jobs, but leave work for the other workers
+				jobs = [jobData]
+				batchSize = min(MAX_JOB_BATCH, math.ceil((self.jobQueue.qsize() + 1) / self.parallelProcesses))
+				while len(jobs) < batchSize and self.jobQueue.qsize() > 0:
+					jobs.append(self.jobQueue.get_nowait())
+				task = asyncio.create_task(self.processingTask(jobs))
+				self.backgroundTasks.add(task)
+				task.add_done_callback(self.releaseSlot)
+				task.add_done_callback(self.taskFinishedCallback)
 				if self.jobQueue.qsize() > 0:
-					workingOnTasks = True
-					self.logger.info(f'Active processes={len(multiprocessing.active_children())}, queue={self.jobQueue.qsize()}')
-				else:
-					if workingOnTasks == True:
-						self.logger.info(f'All processes finished!')
-					workingOnTasks = False
-
-				await asyncio.sleep(5)
+					self.logger.debug(f'Active processes={len(self.backgroundTasks)}, queue={self.jobQueue.qsize()}')
 		except Exception as e:
 			self.logger.error(f'Error at TaskHandler.scheduleTasks')
 			self.logger.error(e)
@@ -0,0 +1,61 @@
+"""
+ @copyright Copyright (C) 2024 Dennis Greguhn <dev@greguhn.de>
+ 
+ @author Dennis Greguhn <dev@greguhn.de>
+ 
+ @license AGPL-3.0-or-later
+ 
+ This program is free software: you can redistribute it and/or modify
+ it under the terms of the GNU Affero General Public License as
+ published by the Free Software Foundation, either version 3 of the
+ License, or (at your option) any later version.
+ 
+ This program is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ GNU Affero General Public License for more details.
+ 
+ You should have received a copy of the GNU Affero General Public License
+ along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+from utils import dataclassFromDict
+
+
+@dataclass
+class Inner:
+	x: int
+	y: str
+
+
+@dataclass
+class Outer:
+	inner: Inner
+	items: List[Inner]
+	note: Optional[str]
+
+
+def test_nested_dataclass():
+	d = {'inner': {'x': 1, 'y': 'a'}, 'items': [{'x': 2, 'y': 'b'}, {'x': 3, 'y': 'c'}], 'note': None}
+	assert dataclassFromDict(Outer, d) == Outer(Inner(1, 'a'), [Inner(2, 'b'), Inner(3, 'c')], None)
+
+
+def test_missing_key_returns_input():
+	d = {'x': 1}
+	assert dataclassFromDict(Inner, d) is d
+
+
+def test_extra_key_returns_input():
+	d = {'x': 1, 'y': 'a', 'z': True}
+	assert dataclassFromDict(Inner, d) is d
+	# Only the unmappable nested value stays a dict
+	outer = dataclassFromDict(Outer, {'inner': d, 'items': [], 'note': 'n'})
+	assert outer == Outer(d, [], 'n')
+
+
+def test_leaf_values_unchanged():
+	assert dataclassFromDict(int, 5) == 5
+	assert dataclassFromDict(List[int], [1, 2]) == [1, 2]
@@ -1,3 +1,13 @@
+import os
+import json
+import threading
+from multiprocessing import Pool
+
+from graphql import GraphQLResolveInfo
+
+from indicator_factory import IndicatorFactory, initWorker, setWorkerConfig
+
+
 async def resolve_startCalculations(_, info:GraphQLResolveInfo):
     # Start calculation with many IDs
 	thread = threading.Thread(target=startIndicatorCalculation, args=(ids,))
@@ -5,12 +15,22 @@ async def resolve_startCalculations(_, info:GraphQLResolveInfo):
 	thread.start()
 
 
+def _initCalculationWorker(config:dict):
+	# One database connection pool and the parsed configuration per worker process
+	setWorkerConfig(config)
+	initWorker()
+
+
 # Sync wrapper function for multiprocessing pool
 def startIndicatorCalculation(ids:list) -> list:
 	#print(f'startIndicatorCalculation with {len(ids)} IDs')
 	try:
-		with Pool(processes=os.cpu_count() - 1) as pool:
-			results = pool.map(calculateMultiprocessing, ids)
+		with open('indicators.json', 'r') as f:
+			config = json.loads(f.read())
+		# Keep one core for the application, but at least one worker (single core containers)
+		processes = max(1, (os.cpu_count() or 1) - 1)
+		with Pool(processes=processes, initializer=_initCalculationWorker, initargs=(config,)) as pool:
+			results = pool.map(IndicatorFactory.calculateMultiprocessing, ids)
 			return results
 	except Exception as e:
 		print(e)
@@ -18,6 +18,40 @@
  You should have received a copy of the GNU Affero General Public License
  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+from collections import OrderedDict
+from functools import lru_cache
+
+
+class LRUCache():
+	"""Small least recently used cache based on an OrderedDict"""
+
+	def __init__(self, maxsize:int=1024):
+		self.maxsize = maxsize
+		self.data = OrderedDict()
+
+	def get(self, key, default=None):
+		try:
+			self.data.move_to_end(key)
+			return self.data[key]
+		except KeyError:
+			return default
+
+	def put(self, key, value):
+		self.data[key] = value
+		self.data.move_to_end(key)
+		if len(self.data) > self.maxsize:
+			self.data.popitem(last=False)
+
+	def clear(self):
+		self.data.clear()
+
+	def __len__(self) -> int:
+		return len(self.data)
+
+
+# Keys forced to upper case by securityInputFilter
+_UPPER_CASE_KEYS = ('code', 'exchange_code')
+
 
 def securityInputFilter(input:dict={}) -> dict:
 	"""Upper case filter for some keys
@@ -28,9 +62,10 @@ def securityInputFilter(input:dict={}) -> dict:
 	Returns:
 		dict: Upper case forced output dict
 	"""
-	for k in ['code', 'exchange_code']:
-		if k in input.keys():
-			input[k] = input[k].upper()
+	for k in _UPPER_CASE_KEYS:
+		value = input.get(k)
+		if value != None:
+			input[k] = value.upper()
 	return input
 
 
@@ -53,21 +88,36 @@ def parseInt(value, default:int) -> int:
 	Returns:
 		int: Parsed or default int
 	"""
-	try:
-		if value == None:
-			return default
-		elif isinstance(value, int):
-			return value
-		elif isinstance(value, str):
+	if value is None:
+		return default
+	if type(value) is int:
+		return value
+	if isinstance(value, str):
+		try:
 			return int(value)
-	except:
-		pass
+		except ValueError:
+			pass
 	return default
 
 
+@lru_cache(maxsize=None)
+def _fieldTypes(c) -> dict:
+	"""Annotated field types of a (data)class, None for leaf or generic types
+
+	Args:
+		c (class): Dataclass reference or type hint
+
+	Returns:
+		dict: Field name -> type or None
+	"""
+	return getattr(c, '__annotations__', None)
+
+
 def dataclassFromDict(c, d):
 	"""Recursive function to create a dataclass object from dictionary.
 
+	Values which can't be mapped to the dataclass are returned unchanged.
+
 	Args:
 		c (class): Dataclass reference
 		d (dict): Dict to convert
@@ -75,11 +125,12 @@ def dataclassFromDict(c, d):
 	Returns:
 		(class): Dataclass object
 	"""
-	try:
-		fieldtypes = c.__annotations__
-		return c(**{f: dataclassFromDict(fieldtypes[f], d[f]) for f in d})
-	#except AttributeError:
-	except Exception as e:
-		if isinstance(d, (tuple, list)):
-			return [dataclassFromDict(c.__args__[0], f) for f in d]
-		return d
\ No newline at end of file
+	fieldtypes = _fieldTypes(c)
+	if fieldtypes != None:
+		try:
+			return c(**{f: dataclassFromDict(fieldtypes[f], d[f]) for f in d})
+		except Exception:
+			pass
+	if isinstance(d, (tuple, list)):
+		return [dataclassFromDict(c.__args__[0], f) for f in d]
+	return d